@@ -3,3 +3,14 @@ from django.apps import AppConfig
 
 class PerformanceAppConfig(AppConfig):
     name = 'performance_app'
+
+    def ready(self):
+        # Register the feature store's Student change signals
+        from . import feature_store  # noqa: F401
+        # Register the per-request query counter on new database connections
+        from . import instrumentation  # noqa: F401
+        # Cache pragmas (and WAL when SQLITE_JOURNAL_MODE is set) on new SQLite connections
+        from . import sqlite_pragmas  # noqa: F401
+        # Opt-in (ML_WARMUP_ON_STARTUP): preload the active model before traffic arrives
+        from .warmup import start_warmup
+        start_warmup()
@@ -0,0 +1,323 @@
+# performance_app/bench_suite.py
+"""
+Application benchmark suite behind ``manage.py bench``.
+
+populate_synthetic_db() fills a throwaway database with instructors,
+courses and students at a chosen scale. The bench_* functions time CSV
+import, training per algorithm, batch prediction, the main pages per role
+(through the test client, with query counts), chart generation, login and
+raw database throughput (to compare SQLite with PostgreSQL).
+Every result is a dict with a ``seconds`` field so runs from different
+commits can be compared with compare_results(). Progress lines go to the
+``stdout`` a function is given (the command passes its own) and are
+dropped when it is None.
+"""
+import datetime
+import io
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .benchmarks import _timed, make_synthetic_students
+from .feature_store import STORE_FIELDS, course_data_versions, get_features_for_courses, invalidate_course
+from .ml_model import StudentPerformancePredictor
+from .models import Course, Instructor, Student, UserProfile
+
+# Synthetic database for the application benchmarks. Every generated account
+# shares one password hash, so populating does not pay for hashing per user.
+BENCH_PASSWORD = 'bench-password'
+BENCH_ADMIN = 'admin'
+BENCH_STUDENTS_PER_COURSE = 500
+BENCH_COURSES_PER_INSTRUCTOR = 4
+
+
+def populate_synthetic_db(n_students, n_courses=None, n_instructors=None, student_accounts=20,
+                          seed=42, chunk_size=10000):
+    """
+    Fill the (empty, throwaway) database with an admin, instructors, courses
+    and ``n_students`` students with bulk_create. The first ``student_accounts``
+    students get login accounts. Returns a summary with one login per role.
+    """
+    n_courses = n_courses or max(1, n_students // BENCH_STUDENTS_PER_COURSE)
+    n_instructors = n_instructors or max(1, n_courses // BENCH_COURSES_PER_INSTRUCTOR)
+    password = make_password(BENCH_PASSWORD)
+
+    with transaction.atomic():
+        admin = User.objects.create(username=BENCH_ADMIN, password=password, is_staff=True, is_superuser=True)
+        UserProfile.objects.create(user=admin, role='admin')
+
+        instructor_users = User.objects.bulk_create([
+            User(username=f'inst_I{i:05d}', first_name='Instructor', last_name=str(i), password=password)
+            for i in range(n_instructors)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=user, role='instructor') for user in instructor_users])
+        Instructor.objects.bulk_create([
+            Instructor(instructor_id=f'I{i:05d}', user_account=user, first_name='Instructor', last_name=str(i),
+                       email=f'instructor{i}@example.edu')
+            for i, user in enumerate(instructor_users)
+        ])
+
+        today = datetime.date.today()
+        courses = Course.objects.bulk_create([
+            Course(course_id=f'C{i:05d}', course_name=f'Course {i}', instructor=instructor_users[i % n_instructors],
+                   start_date=today, end_date=today + datetime.timedelta(days=120))
+            for i in range(n_courses)
+        ])
+
+        student_users = User.objects.bulk_create([
+            User(username=f'stu_S{i:07d}', first_name='Student', last_name=str(i), password=password)
+            for i in range(min(student_accounts, n_students))
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=user, role='student') for user in student_users])
+
+    for start in range(0, n_students, chunk_size):
+        size = min(chunk_size, n_students - start)
+        df = make_synthetic_students(size, seed=seed + start)
+        with transaction.atomic():
+            Student.objects.bulk_create([
+                Student(
+                    student_id=f'S{start + i:07d}',
+                    user_account=student_users[start + i] if start + i < len(student_users) else None,
+                    first_name='Student', last_name=str(start + i), email=f'student{start + i}@example.edu',
+                    course=courses[(start + i) % n_courses],
+                    attendance=row.attendance, assignment_score=row.assignment_score,
+                    quiz_score=row.quiz_score, time_spent=row.time_spent,
+                    forum_posts=row.forum_posts, resources_viewed=row.resources_viewed,
+                )
+                for i, row in enumerate(df.itertuples(index=False))
+            ], batch_size=2000)
+
+    # bulk_create sends no signals: drop any cached feature-store versions
+    for course in courses:
+        invalidate_course(course.id)
+
+    return {
+        'students': n_students,
+        'courses': n_courses,
+        'instructors': n_instructors,
+        'logins': {
+            'admin': BENCH_ADMIN,
+            'instructor': 'I00000',
+            'student': 'S0000000' if student_users else None,
+        },
+    }
+
+
+def _report(stdout, line):
+    if stdout is not None:
+        stdout.write(line + '\n')
+
+
+def _client_for(identifier):
+    """
+    Test client logged in through the login view (Student/Instructor ID or 'admin');
+    failing pages are reported by status instead of raising
+    """
+    client = Client(raise_request_exception=False)
+    response = client.post(reverse('login'), {'username': identifier, 'password': BENCH_PASSWORD})
+    if '_auth_user_id' not in client.session:
+        raise RuntimeError(f'Benchmark login failed for {identifier} (HTTP {response.status_code})')
+    return client
+
+
+def _time_request(client, method, url, repeats, **kwargs):
+    """
+    (median seconds, queries of the last run, status) of ``repeats`` requests
+    """
+    durations = []
+    for _ in range(repeats):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            durations.append(time.perf_counter() - start)
+    return statistics.median(durations), len(queries), response.status_code
+
+
+def bench_login(logins, repeats=5, stdout=None):
+    """
+    Login POST per role (password check and redirect included), each from a fresh session
+    """
+    results = []
+    for role, identifier in logins.items():
+        if identifier is None:
+            continue
+        runs = [
+            _time_request(Client(), 'post', reverse('login'), 1,
+                          data={'username': identifier, 'password': BENCH_PASSWORD})
+            for _ in range(repeats)
+        ]
+        seconds = statistics.median(run[0] for run in runs)
+        _, queries, status = runs[-1]
+        results.append({'benchmark': 'login', 'role': role, 'seconds': round(seconds, 4),
+                        'queries': queries, 'status': status})
+        _report(stdout, f"login {role:<11} {seconds * 1000:9.1f}ms queries={queries} HTTP {status}")
+    return results
+
+
+# Pages per role for bench_views
+BENCH_VIEWS = {
+    'admin': ('admin_dashboard', 'dashboard', 'students_list', 'predictions_view', 'courses_list',
+              'admin_students_list'),
+    'instructor': ('dashboard', 'students_list', 'predictions_view', 'courses_list'),
+    'student': ('dashboard', 'student_predictions', 'student_courses'),
+}
+
+
+def bench_views(logins, repeats=3, stdout=None):
+    """
+    Median wall time and query count of the main pages for every role
+    """
+    results = []
+    for role, identifier in logins.items():
+        if identifier is None:
+            continue
+        client = _client_for(identifier)
+        for view in BENCH_VIEWS[role]:
+            seconds, queries, status = _time_request(client, 'get', reverse(view), repeats)
+            results.append({'benchmark': 'views', 'role': role, 'view': view, 'seconds': round(seconds, 4),
+                            'queries': queries, 'status': status})
+            _report(stdout, f"view {role:<11} {view:<22} {seconds * 1000:9.1f}ms queries={queries} HTTP {status}")
+    return results
+
+
+def bench_csv_import(n_rows=50, course=None, stdout=None):
+    """
+    upload_csv with a generated file of ``n_rows`` new students (one account each)
+    """
+    course = course or Course.objects.order_by('id').first()
+    df = make_synthetic_students(n_rows, seed=7)
+    df['student_id'] = [f'IMP{i:07d}' for i in range(n_rows)]
+    df.insert(1, 'first_name', 'Imported')
+    df.insert(2, 'last_name', [str(i) for i in range(n_rows)])
+    df.insert(3, 'email', [f'imported{i}@example.edu' for i in range(n_rows)])
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+
+    client = _client_for(BENCH_ADMIN)
+    upload = SimpleUploadedFile('bench_import.csv', buffer.getvalue().encode(), content_type='text/csv')
+    seconds, queries, status = _time_request(
+        client, 'post', reverse('upload_csv'), 1, data={'course': course.id, 'file': upload},
+    )
+    _report(stdout, f"csv import rows={n_rows:<8} {seconds:8.2f}s queries={queries} HTTP {status}")
+    return [{'benchmark': 'csv_import', 'rows': n_rows, 'seconds': round(seconds, 4),
+             'rows_per_second': round(n_rows / seconds, 1), 'queries': queries, 'status': status}]
+
+
+BENCH_ALGORITHMS = ('random_forest', 'decision_tree', 'logistic_regression', 'svm',
+                    'gradient_boosting', 'hist_gradient_boosting', 'sgd')
+
+
+def bench_training(features, algorithms=BENCH_ALGORITHMS, max_rows=20000, stdout=None):
+    """
+    train_model (CV + final fit) per algorithm on up to ``max_rows`` stored students
+    """
+    X = features.X[:max_rows]
+    results = []
+    for algorithm in algorithms:
+        predictor = StudentPerformancePredictor()
+        elapsed, (metrics, _) = _timed(predictor.train_model, X, algorithm)
+        results.append({
+            'benchmark': 'training',
+            'algorithm': algorithm,
+            'trained': predictor.manifest['algorithm'],
+            'rows': int(len(X)),
+            'seconds': round(elapsed, 3),
+            'accuracy': round(metrics['accuracy'], 4),
+        })
+        _report(stdout, f"train {algorithm:<24} rows={len(X):<8} {elapsed:8.2f}s accuracy={metrics['accuracy']:.4f}")
+    return results
+
+
+def bench_batch_prediction(features, algorithm='random_forest', train_rows=20000, stdout=None):
+    """
+    predict_batch over every stored student, as the predict view does
+    """
+    predictor = StudentPerformancePredictor()
+    predictor.train_model(features.X[:train_rows], algorithm)
+    elapsed, predictions = _timed(predictor.predict_batch, features.X, student_ids=list(features.student_ids))
+    _report(stdout, f"predict_batch {algorithm:<16} rows={len(predictions):<8} {elapsed:8.2f}s")
+    return [{'benchmark': 'batch_prediction', 'algorithm': algorithm, 'rows': len(predictions),
+             'seconds': round(elapsed, 3), 'rows_per_second': round(len(predictions) / elapsed, 1)}]
+
+
+def bench_charts(features, stdout=None):
+    """
+    generate_charts for all students (the admin visualize page)
+    """
+    from performance_app.utils import generate_charts
+
+    elapsed, _ = _timed(generate_charts, features)
+    _report(stdout, f"charts rows={len(features.ids):<8} {elapsed:8.2f}s")
+    return [{'benchmark': 'charts', 'rows': int(len(features.ids)), 'seconds': round(elapsed, 3)}]
+
+
+def _db_result(operation, seconds, rows, stdout, **extra):
+    _report(stdout, f"db {connection.vendor:<10} {operation:<12} rows={rows:<8} {seconds * 1000:9.1f}ms")
+    return {'benchmark': 'database', 'operation': operation, 'database': connection.vendor,
+            'rows': rows, 'seconds': round(seconds, 4), 'rows_per_second': round(rows / seconds, 1),
+            **extra}
+
+
+def bench_database(chunk_size=10000, update_rows=5000, search='S00001', stdout=None):
+    """
+    Database throughput of the application's bulk access paths: streaming every
+    student row, per-course version aggregates, students_list search and a
+    bulk_update of predictions (rolled back)
+    """
+    results = []
+    start = time.perf_counter()
+    rows = sum(1 for _ in Student.objects.order_by('id').values_list(*STORE_FIELDS).iterator(chunk_size=chunk_size))
+    results.append(_db_result('scan', time.perf_counter() - start, rows, stdout))
+
+    course_ids = list(Course.objects.values_list('id', flat=True))
+    cache.clear()
+    elapsed, _ = _timed(course_data_versions, course_ids)
+    results.append(_db_result('versions', elapsed, len(course_ids), stdout))
+
+    start = time.perf_counter()
+    matches = Student.objects.filter(student_id__icontains=search).count()
+    results.append(_db_result('search', time.perf_counter() - start, matches, stdout))
+
+    students = list(Student.objects.order_by('id').only('id', 'predicted_performance')[:update_rows])
+    for student in students:
+        student.predicted_performance = 'average'
+    with transaction.atomic():
+        elapsed, _ = _timed(Student.objects.bulk_update, students, ['predicted_performance'], batch_size=1000)
+        transaction.set_rollback(True)
+    results.append(_db_result('bulk_update', elapsed, len(students), stdout))
+    return results
+
+
+def all_course_features():
+    return get_features_for_courses(list(Course.objects.order_by('id').values_list('id', flat=True)))
+
+
+# Identity fields of a result record; 'seconds' is compared between runs
+RESULT_KEY_FIELDS = ('benchmark', 'role', 'view', 'algorithm', 'engine', 'operation', 'rows', 'cores')
+
+
+def result_key(record):
+    return tuple((field, record[field]) for field in RESULT_KEY_FIELDS if field in record)
+
+
+def compare_results(baseline, current):
+    """
+    [(key, baseline seconds, current seconds, ratio)] for records present in both runs
+    """
+    previous = {result_key(record): record['seconds'] for record in baseline if 'seconds' in record}
+    rows = []
+    for record in current:
+        key = result_key(record)
+        if 'seconds' in record and previous.get(key):
+            rows.append((key, previous[key], record['seconds'], record['seconds'] / previous[key]))
+    return rows
@@ -0,0 +1,274 @@
+# performance_app/benchmarks.py
+"""
+Benchmarks for the ML pipeline
+
+Run directly:  python -m performance_app.benchmarks [rows]
+Application benchmarks (views, import, login): python manage.py bench, see bench_suite
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from performance_app.ml_model import StudentPerformancePredictor, rule_labels, to_feature_matrix
+
+
+def make_synthetic_students(n_rows, seed=42):
+    """
+    Synthetic student feature table with the same columns as the Student model
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'student_id': [f'S{i:07d}' for i in range(n_rows)],
+        'attendance': rng.uniform(30, 100, n_rows),
+        'assignment_score': rng.uniform(20, 100, n_rows),
+        'quiz_score': rng.uniform(20, 100, n_rows),
+        'time_spent': rng.uniform(5, 60, n_rows),
+        'forum_posts': rng.integers(0, 25, n_rows),
+        'resources_viewed': rng.integers(0, 60, n_rows),
+    })
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_training_cores(n_rows=50000, core_counts=None, algorithm='random_forest'):
+    """
+    Fit time (fit + CV) vs. number of cores
+    """
+    df = make_synthetic_students(n_rows)
+    if core_counts is None:
+        max_cores = os.cpu_count() or 1
+        core_counts = sorted({1, 2, 4, 8, 16, 32, max_cores} & set(range(1, max_cores + 1)))
+
+    results = []
+    for cores in core_counts:
+        predictor = StudentPerformancePredictor(
+            resources={'n_jobs': cores, 'cv_n_jobs': cores, 'blas_threads': cores}
+        )
+        elapsed, (metrics, _) = _timed(predictor.train_model, df, algorithm)
+        results.append({
+            'benchmark': 'training_cores',
+            'algorithm': algorithm,
+            'rows': n_rows,
+            'cores': cores,
+            'seconds': round(elapsed, 3),
+            'cv_mean': metrics['cv_mean'],
+        })
+        print(f"{algorithm:<20} rows={n_rows:<8} cores={cores:<3} fit+cv={elapsed:8.2f}s")
+    return results
+
+
+def bench_gradient_boosting(row_counts=(10000, 100000, 1000000), exact_max_rows=100000):
+    """
+    Exact GradientBoosting vs. HistGradientBoosting: fit time and held-out accuracy.
+    The exact booster is skipped above ``exact_max_rows`` (it takes hours at 1M rows).
+    """
+    predictor = StudentPerformancePredictor()
+    results = []
+    for n_rows in row_counts:
+        df = predictor.create_synthetic_labels(make_synthetic_students(n_rows))
+        X_train, X_test, y_train, y_test = train_test_split(
+            to_feature_matrix(df), df['performance_label'].to_numpy(), test_size=0.2, random_state=42
+        )
+        for algorithm in ('gradient_boosting', 'hist_gradient_boosting'):
+            if algorithm == 'gradient_boosting' and n_rows > exact_max_rows:
+                print(f"{algorithm:<24} rows={n_rows:<8} skipped (> {exact_max_rows} rows)")
+                continue
+            model = predictor.build_estimator(algorithm)
+            elapsed, _ = _timed(model.fit, X_train, y_train)
+            accuracy = accuracy_score(y_test, model.predict(X_test))
+            results.append({
+                'benchmark': 'gradient_boosting',
+                'algorithm': algorithm,
+                'rows': n_rows,
+                'seconds': round(elapsed, 3),
+                'accuracy': round(accuracy, 4),
+            })
+            print(f"{algorithm:<24} rows={n_rows:<8} fit={elapsed:8.2f}s accuracy={accuracy:.4f}")
+    return results
+
+
+def bench_rule_fallback(n_rows=100000):
+    """
+    Vectorized rule engine vs. the per-row rule_based_prediction loop
+    """
+    df = make_synthetic_students(n_rows)
+    predictor = StudentPerformancePredictor()
+    X = to_feature_matrix(df)
+    vectorized, _ = _timed(rule_labels, X)
+    sample = min(n_rows, 10000)
+    per_row, _ = _timed(lambda: [predictor.rule_based_prediction(df.iloc[idx]) for idx in range(sample)])
+    per_row_estimate = per_row * n_rows / sample
+    print(f"rule fallback rows={n_rows:<8} vectorized={vectorized * 1000:8.2f}ms "
+          f"per-row~={per_row_estimate * 1000:10.1f}ms")
+    return [{
+        'benchmark': 'rule_fallback',
+        'rows': n_rows,
+        'vectorized_ms': round(vectorized * 1000, 3),
+        'per_row_ms_estimate': round(per_row_estimate * 1000, 1),
+    }]
+
+
+def bench_single_row_latency(algorithm='random_forest', n_rows=5000, repeats=200):
+    """
+    Single-student predict_proba latency: sklearn pipeline vs. compiled trees
+    """
+    df = make_synthetic_students(n_rows)
+    predictor = StudentPerformancePredictor()
+    predictor.train_model(df, algorithm)
+    predictor.compile_trees()
+    row = to_feature_matrix(df.head(1))
+
+    results = []
+    for engine, predict in (('sklearn', predictor.pipeline.predict_proba),
+                            ('compiled', predictor.compiled.predict_proba)):
+        predict(row)  # warm-up
+        micros = min(timeit.repeat(lambda: predict(row), number=repeats, repeat=5)) / repeats * 1e6
+        results.append({
+            'benchmark': 'single_row_latency',
+            'algorithm': algorithm,
+            'engine': engine,
+            'microseconds': round(micros, 1),
+        })
+        print(f"{algorithm:<20} {engine:<9} single row={micros:9.1f}us")
+    return results
+
+
+def bench_svm(row_counts=(5000, 20000, 100000), exact_max_rows=20000, predict_rows=1000):
+    """
+    Exact SVC(probability=True) vs. the Nystroem + calibrated LinearSVC approximation:
+    fit time, batch predict_proba time and held-out accuracy.
+    The exact SVC is skipped above ``exact_max_rows``.
+    """
+    predictor = StudentPerformancePredictor()
+    results = []
+    for n_rows in row_counts:
+        df = predictor.create_synthetic_labels(make_synthetic_students(n_rows))
+        X_train, X_test, y_train, y_test = train_test_split(
+            to_feature_matrix(df), df['performance_label'].to_numpy(), test_size=0.2, random_state=42
+        )
+        for algorithm in ('svm', 'svm_approx'):
+            if algorithm == 'svm' and n_rows > exact_max_rows:
+                print(f"{algorithm:<12} rows={n_rows:<8} skipped (> {exact_max_rows} rows)")
+                continue
+            pipeline = predictor.build_pipeline(predictor.build_estimator(algorithm))
+            fit_seconds, _ = _timed(pipeline.fit, X_train, y_train)
+            predict_seconds, _ = _timed(pipeline.predict_proba, X_test[:predict_rows])
+            accuracy = accuracy_score(y_test, pipeline.predict(X_test))
+            results.append({
+                'benchmark': 'svm',
+                'algorithm': algorithm,
+                'rows': n_rows,
+                'fit_seconds': round(fit_seconds, 3),
+                'predict_ms': round(predict_seconds * 1000, 2),
+                'accuracy': round(accuracy, 4),
+            })
+            print(f"{algorithm:<12} rows={n_rows:<8} fit={fit_seconds:8.2f}s "
+                  f"predict({predict_rows})={predict_seconds * 1000:8.1f}ms accuracy={accuracy:.4f}")
+    return results
+
+
+# Modules that must stay off the request path until a view actually needs them
+HEAVY_STARTUP_MODULES = ('pandas', 'sklearn', 'scipy', 'matplotlib', 'reportlab')
+STARTUP_SCRIPT = "import django; django.setup(); import student_performance.urls"
+
+
+def import_time_profile(script=STARTUP_SCRIPT):
+    """
+    Run ``script`` in a fresh interpreter under -X importtime; returns
+    {module: (self_us, cumulative_us)} for every module it imported
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+        'DJANGO_SETTINGS_MODULE', 'student_performance.settings'))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        capture_output=True, text=True, env=env, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def bench_startup_imports(script=STARTUP_SCRIPT, top=15):
+    """
+    Import cost of django.setup() + URLconf, i.e. what every worker pays before its first request
+    """
+    profile = import_time_profile(script)
+    total = sum(self_us for self_us, _ in profile.values()) / 1e6
+    heavy = sorted({name.split('.')[0] for name in profile} & set(HEAVY_STARTUP_MODULES))
+    print(f"startup imports: {len(profile)} modules in {total:.3f}s, heavy: {', '.join(heavy) or 'none'}")
+    for name, (_, cumulative_us) in sorted(profile.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"  {cumulative_us / 1000:9.1f}ms  {name}")
+    return {
+        'benchmark': 'startup_imports',
+        'modules': len(profile),
+        'seconds': round(total, 3),
+        'heavy_modules': heavy,
+    }
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_out_of_core(row_counts=(1000000, 10000000), chunk_size=200000):
+    """
+    Streaming SGD training: wall time and peak RSS growth per dataset size.
+    Chunks are generated on the fly, so flat peak RSS means bounded memory.
+    """
+    results = []
+    for n_rows in row_counts:
+        def chunks():
+            for start in range(0, n_rows, chunk_size):
+                size = min(chunk_size, n_rows - start)
+                yield to_feature_matrix(make_synthetic_students(size, seed=start)), None
+
+        before = _peak_rss_mb()
+        predictor = StudentPerformancePredictor()
+        elapsed, (metrics, _) = _timed(predictor.train_streaming, chunks, 'sgd')
+        growth = _peak_rss_mb() - before
+        results.append({
+            'benchmark': 'out_of_core',
+            'algorithm': 'sgd',
+            'rows': n_rows,
+            'chunk_size': chunk_size,
+            'seconds': round(elapsed, 3),
+            'peak_rss_growth_mb': round(growth, 1),
+            'accuracy': round(metrics['accuracy'], 4),
+        })
+        print(f"sgd streaming rows={n_rows:<9} fit={elapsed:8.2f}s peak RSS +{growth:7.1f}MB "
+              f"accuracy={metrics['accuracy']:.4f}")
+    return results
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_performance.settings')
+    import django
+    django.setup()
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    bench_startup_imports()
+    bench_training_cores(rows)
+    bench_gradient_boosting()
+    bench_rule_fallback()
+    bench_single_row_latency('random_forest')
+    bench_single_row_latency('decision_tree')
+    bench_svm()
+    bench_out_of_core()
@@ -0,0 +1,95 @@
+# performance_app/exports.py
+"""
+Streaming exports of student predictions.
+
+Rows are read with values_list().iterator(chunk_size=...) (a server-side
+cursor on PostgreSQL), so exports use constant memory however many students
+are in scope. CSV is generated while it is sent; XLSX needs the optional
+openpyxl package and is written to a spooled temporary file first.
+
+Names and emails come from uploaded CSVs, so text cells that a spreadsheet
+would evaluate as a formula are prefixed with a quote (see spreadsheet_safe).
+"""
+import csv
+import io
+import tempfile
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+from .features import FEATURE_COLUMNS
+
+# (values_list field, column header)
+EXPORT_FIELDS = (
+    ('student_id', 'student_id'),
+    ('first_name', 'first_name'),
+    ('last_name', 'last_name'),
+    ('course__course_id', 'course'),
+    *((column, column) for column in FEATURE_COLUMNS),
+    ('predicted_performance', 'predicted_performance'),
+    ('prediction_confidence', 'confidence'),
+    ('is_at_risk', 'is_at_risk'),
+    ('prediction_model', 'model_version'),
+    ('updated_at', 'updated_at'),
+)
+
+
+# Leading characters Excel/LibreOffice treat as the start of a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def spreadsheet_safe(value):
+    """
+    ``value`` with a quote in front when it is text a spreadsheet would run as a formula
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_rows(students, chunk_size=2000):
+    """
+    Header followed by one row per student
+    """
+    yield [header for _, header in EXPORT_FIELDS]
+    queryset = students.order_by('student_id').values_list(*(field for field, _ in EXPORT_FIELDS))
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield [spreadsheet_safe(value) for value in row]
+
+
+def predictions_csv(students, chunk_size=2000, rows_per_write=500):
+    """
+    CSV text chunks for StreamingHttpResponse; the header is sent before the first query
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = 0
+    for row in export_rows(students, chunk_size):
+        writer.writerow(row)
+        rows += 1
+        if rows == 1 or rows % rows_per_write == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def xlsx_available():
+    return openpyxl is not None
+
+
+def predictions_xlsx(students, chunk_size=2000):
+    """
+    Predictions workbook in a rewound temporary file (write-only openpyxl mode)
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Predictions')
+    for row in export_rows(students, chunk_size):
+        # Excel has no timezone-aware datetimes
+        sheet.append([value.replace(tzinfo=None) if hasattr(value, 'tzinfo') else value for value in row])
+    output = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+    workbook.save(output)
+    output.seek(0)
+    return output
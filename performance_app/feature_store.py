@@ -0,0 +1,304 @@
+# performance_app/feature_store.py
+"""
+Per-course feature matrices, cached by course data version.
+
+A course's students are read once with values_list() into float32 arrays and
+kept in process memory and on disk (MEDIA_ROOT/feature_store/), keyed by the
+course's data version (student count + last updated_at).
+
+With a shared cache backend (REDIS_URL) the versions are cached for
+FEATURE_STORE_VERSION_TTL seconds and invalidated by Student save/delete
+signals (and explicitly after bulk updates), so repeat reads of an unchanged
+course do not touch the database. A process-local cache cannot see changes
+made by other worker processes, so there the versions are read from the
+database on every call (one grouped aggregate over the course/updated_at
+index) and only the feature matrices are cached.
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .features import FEATURE_COLUMNS
+from .instrumentation import count_cache
+from .models import Student
+
+CourseFeatures = namedtuple('CourseFeatures', ['ids', 'student_ids', 'X', 'predicted', 'at_risk', 'version'])
+
+STORE_FIELDS = ('id', 'student_id', *FEATURE_COLUMNS, 'predicted_performance', 'is_at_risk')
+STREAM_CHUNK_SIZE = 20000
+
+# Cache backends private to one process
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+# Course ids whose invalidation is deferred by deferred_invalidation()
+_deferred = ContextVar('feature_store_deferred', default=None)
+
+
+def versions_cacheable():
+    """
+    True when data versions can be cached: the cache is shared by all worker processes
+    """
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def _version_key(course_id):
+    return f'feature_store:version:{course_id if course_id is not None else "none"}'
+
+
+def _students(course_ids):
+    """
+    Students of several courses; ``None`` in ``course_ids`` selects students without a course
+    """
+    condition = Q(course_id__in=[course_id for course_id in course_ids if course_id is not None])
+    if None in course_ids:
+        condition |= Q(course__isnull=True)
+    return Student.objects.filter(condition)
+
+
+def _format_version(count, updated):
+    updated = updated.timestamp() if updated else 0
+    return f"{count}-{int(updated * 1e6)}"
+
+
+def course_data_versions(course_ids, fresh=False):
+    """
+    {course_id: version} with one cache round trip and, for uncached courses,
+    one grouped aggregate query. ``fresh`` (and a process-local cache) always
+    reads the database.
+    """
+    keys = {course_id: _version_key(course_id) for course_id in course_ids}
+    cacheable = versions_cacheable()
+    versions = {}
+    if cacheable and not fresh:
+        cached = cache.get_many(list(keys.values()))
+        for course_id, key in keys.items():
+            count_cache('feature_version', key in cached)
+            if key in cached:
+                versions[course_id] = cached[key]
+
+    missing = [course_id for course_id in keys if course_id not in versions]
+    if missing:
+        stats = {
+            row['course_id']: _format_version(row['count'], row['updated'])
+            for row in _students(missing).order_by().values('course_id')
+            .annotate(count=Count('id'), updated=Max('updated_at'))
+        }
+        loaded = {course_id: stats.get(course_id, _format_version(0, None)) for course_id in missing}
+        if cacheable:
+            cache.set_many({keys[course_id]: version for course_id, version in loaded.items()},
+                           timeout=getattr(settings, 'FEATURE_STORE_VERSION_TTL', 300))
+        versions.update(loaded)
+    return versions
+
+
+def course_data_version(course_id, fresh=False):
+    """
+    Version token of a course's student rows (count + last update)
+    """
+    return course_data_versions([course_id], fresh=fresh)[course_id]
+
+
+def invalidate_course(course_id):
+    """
+    Drop the cached version of a course; call after queryset.update()/bulk_update().
+    Bulk writes should also set updated_at so other processes see a new version.
+    Feature files of old versions are removed when the next version is saved.
+    """
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred.add(course_id)
+        return
+    if versions_cacheable():
+        cache.delete(_version_key(course_id))
+    with _memory_lock:
+        for key in [key for key in _memory if key[0] == course_id]:
+            del _memory[key]
+
+
+@contextmanager
+def deferred_invalidation():
+    """
+    Collect invalidate_course() calls (e.g. from per-row save signals during an
+    import) and run them once per course when the block exits
+    """
+    if _deferred.get() is not None:
+        yield
+        return
+    courses = set()
+    token = _deferred.set(courses)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        for course_id in courses:
+            invalidate_course(course_id)
+
+
+def build_course_features(queryset, version=None):
+    """
+    CourseFeatures straight from values_list(), without model instances
+    """
+    return _features_from_rows(list(queryset.order_by('id').values_list(*STORE_FIELDS)), version)
+
+
+def _features_from_rows(rows, version):
+    n_features = len(FEATURE_COLUMNS)
+    if not rows:
+        return CourseFeatures(
+            np.empty(0, dtype=np.int64), np.empty(0, dtype=str), np.empty((0, n_features), dtype=np.float32),
+            np.empty(0, dtype=str), np.empty(0, dtype=bool), version,
+        )
+    columns = list(zip(*rows))
+    # Fixed-width unicode rather than object arrays, so the .npz files load
+    # without pickle
+    X = np.empty((len(rows), n_features), dtype=np.float32)
+    for i in range(n_features):
+        X[:, i] = np.array(columns[2 + i], dtype=np.float32)
+    return CourseFeatures(
+        ids=np.array(columns[0], dtype=np.int64),
+        student_ids=np.array(columns[1], dtype=str),
+        X=X,
+        predicted=np.array(columns[2 + n_features], dtype=str),
+        at_risk=np.array(columns[3 + n_features], dtype=bool),
+        version=version,
+    )
+
+
+def _disk_path(course_id, version):
+    directory = os.path.join(settings.MEDIA_ROOT, 'feature_store')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'course_{course_id if course_id is not None else "none"}_{version}.npz')
+
+
+def _remember(key, features):
+    with _memory_lock:
+        _memory[key] = features
+        _memory.move_to_end(key)
+        while len(_memory) > getattr(settings, 'FEATURE_STORE_MEMORY_ITEMS', 32):
+            _memory.popitem(last=False)
+
+
+def _save(course_id, features):
+    path = _disk_path(course_id, features.version)
+    tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(tmp_path, ids=features.ids, student_ids=features.student_ids, X=features.X,
+             predicted=features.predicted, at_risk=features.at_risk)
+    os.replace(tmp_path, path)
+
+    # Files of older versions of this course are no longer reachable
+    directory = os.path.dirname(path)
+    prefix = f'course_{course_id if course_id is not None else "none"}_'
+    for name in os.listdir(directory):
+        if (name.startswith(prefix) and name.endswith('.npz') and not name.endswith('.tmp.npz')
+                and name != os.path.basename(path)):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def _build_many(course_ids, versions):
+    """
+    Build the feature matrices of several courses from one values_list() query
+    """
+    # Streamed in chunks (a server-side cursor on PostgreSQL)
+    rows = (_students(course_ids).order_by('course_id', 'id').values_list('course_id', *STORE_FIELDS)
+            .iterator(chunk_size=STREAM_CHUNK_SIZE))
+    grouped = {course_id: [row[1:] for row in group] for course_id, group in groupby(rows, key=itemgetter(0))}
+    return {
+        course_id: _features_from_rows(grouped.get(course_id, []), versions[course_id])
+        for course_id in course_ids
+    }
+
+
+def _cached_features(course_ids, fresh=False):
+    """
+    CourseFeatures per course, in order: memory, then disk, then one query for
+    everything still missing
+    """
+    versions = course_data_versions(course_ids, fresh=fresh)
+    found = {}
+    for course_id in course_ids:
+        key = (course_id, versions[course_id])
+        with _memory_lock:
+            features = _memory.get(key)
+        count_cache('feature_memory', features is not None)
+        if features is None:
+            path = _disk_path(course_id, versions[course_id])
+            on_disk = os.path.exists(path)
+            count_cache('feature_disk', on_disk)
+            if not on_disk:
+                continue
+            with np.load(path, allow_pickle=False) as data:
+                features = CourseFeatures(
+                    data['ids'], data['student_ids'], data['X'], data['predicted'], data['at_risk'],
+                    versions[course_id],
+                )
+            _remember(key, features)
+        found[course_id] = features
+
+    missing = list(dict.fromkeys(course_id for course_id in course_ids if course_id not in found))
+    if missing:
+        for course_id, features in _build_many(missing, versions).items():
+            _save(course_id, features)
+            _remember((course_id, features.version), features)
+            found[course_id] = features
+    return [found[course_id] for course_id in course_ids]
+
+
+def get_course_features(course_id, fresh=False):
+    """
+    Cached CourseFeatures for one course (``None`` = students without a course);
+    ``fresh`` checks the data version against the database first
+    """
+    return _cached_features([course_id], fresh=fresh)[0]
+
+
+def get_features_for_courses(course_ids):
+    """
+    Concatenated CourseFeatures for several courses
+    """
+    if not course_ids:
+        return build_course_features(Student.objects.none())
+    parts = _cached_features(list(course_ids))
+    if len(parts) == 1:
+        return parts[0]
+    return CourseFeatures(
+        np.concatenate([part.ids for part in parts]),
+        np.concatenate([part.student_ids for part in parts]),
+        np.concatenate([part.X for part in parts]),
+        np.concatenate([part.predicted for part in parts]),
+        np.concatenate([part.at_risk for part in parts]),
+        tuple(part.version for part in parts),
+    )
+
+
+@receiver(post_init, sender=Student)
+def _remember_loaded_course(sender, instance, **kwargs):
+    instance._feature_store_course_id = instance.course_id
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def _invalidate_on_change(sender, instance, **kwargs):
+    invalidate_course(instance.course_id)
+    previous = getattr(instance, '_feature_store_course_id', instance.course_id)
+    if previous != instance.course_id:
+        invalidate_course(previous)
+    instance._feature_store_course_id = instance.course_id
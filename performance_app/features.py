@@ -0,0 +1,95 @@
+# performance_app/features.py
+"""
+Feature schema and rule-based scoring.
+
+Only depends on NumPy so that views, the feature store and online scoring
+can use the schema without importing pandas or scikit-learn.
+"""
+import sys
+
+import numpy as np
+
+
+# Feature schema: (column, default used when the column is missing).
+# The single source of truth for feature order in training, prediction and rules.
+FEATURE_SCHEMA = (
+    ('attendance', 75.0),        # Default average score
+    ('assignment_score', 75.0),
+    ('quiz_score', 75.0),
+    ('time_spent', 30.0),        # Default 30 hours
+    ('forum_posts', 10.0),       # Default count
+    ('resources_viewed', 10.0),
+)
+FEATURE_COLUMNS = [name for name, _ in FEATURE_SCHEMA]
+FEATURE_DEFAULTS = np.array([default for _, default in FEATURE_SCHEMA], dtype=np.float32)
+
+
+def to_feature_matrix(data):
+    """
+    C-contiguous float32 matrix in FEATURE_COLUMNS order.
+
+    Accepts a DataFrame, a list of dicts or an array already in schema order.
+    Missing columns get their schema default; missing values stay NaN for the
+    pipeline's imputer. The caller's DataFrame is never modified.
+    """
+    # pandas is only imported by callers that already hold a DataFrame
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(data, pd.DataFrame):
+        X = np.empty((len(data), len(FEATURE_COLUMNS)), dtype=np.float32)
+        for i, (col, default) in enumerate(FEATURE_SCHEMA):
+            if col in data.columns:
+                X[:, i] = pd.to_numeric(data[col], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+            else:
+                X[:, i] = default
+        return X
+    if isinstance(data, (list, tuple)) and data and isinstance(data[0], dict):
+        return np.array(
+            [[row.get(col, default) if row.get(col, default) is not None else np.nan
+              for col, default in FEATURE_SCHEMA] for row in data],
+            dtype=np.float32,
+        )
+    return np.ascontiguousarray(data, dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS))
+
+
+# Rule-based scoring, shared by the fallback predictor and synthetic labels.
+# column -> (weight, full-marks value); each term is scaled to 0-100 and clipped.
+RULE_WEIGHTS = {
+    'attendance': (0.2, 100.0),
+    'assignment_score': (0.3, 100.0),
+    'quiz_score': (0.3, 100.0),
+    'time_spent': (0.1, 60.0),
+    'forum_posts': (0.05, 20.0),
+    'resources_viewed': (0.05, 50.0),
+}
+# (minimum weighted score, label), checked top-down; anything lower is RULE_DEFAULT_LABEL
+RULE_THRESHOLDS = (
+    (85, 'excellent'),
+    (70, 'good'),
+    (50, 'average'),
+    (35, 'poor'),
+)
+RULE_DEFAULT_LABEL = 'at_risk'
+
+_RULE_WEIGHT_VECTOR = np.array([RULE_WEIGHTS[col][0] for col in FEATURE_COLUMNS], dtype=np.float32)
+_RULE_SCALE_VECTOR = np.array([100.0 / RULE_WEIGHTS[col][1] for col in FEATURE_COLUMNS], dtype=np.float32)
+
+
+def rule_scores(X):
+    """
+    Weighted rule score (0-100) for every row of a schema-ordered feature matrix
+    """
+    X = np.asarray(X, dtype=np.float32)
+    X = np.where(np.isnan(X), FEATURE_DEFAULTS, X)
+    return np.clip(X * _RULE_SCALE_VECTOR, 0, 100) @ _RULE_WEIGHT_VECTOR
+
+
+def rule_labels(X):
+    """
+    Rule-based performance labels for every row of a schema-ordered feature matrix
+    """
+    scores = rule_scores(X)
+    return np.select(
+        [scores >= threshold for threshold, _ in RULE_THRESHOLDS],
+        [label for _, label in RULE_THRESHOLDS],
+        default=RULE_DEFAULT_LABEL,
+    )
@@ -0,0 +1,277 @@
+# performance_app/inference.py
+"""
+Online scoring against the active PredictionModel.
+
+The active model is loaded once per process and reused until another
+PredictionModel becomes active. Concurrent single-student requests are
+coalesced by MicroBatcher into one predict_proba call.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .features import FEATURE_COLUMNS, FEATURE_DEFAULTS, RULE_WEIGHTS, rule_labels, to_feature_matrix
+from .models import PredictionModel
+
+
+class MicroBatcher:
+    """
+    Collects rows submitted within ``max_wait`` seconds (or until ``max_batch``
+    rows) and scores them with a single ``predict_fn`` call on a worker thread
+    """
+
+    def __init__(self, predict_fn, max_wait=0.002, max_batch=64):
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='prediction-microbatcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, row):
+        """
+        Queue one schema-ordered feature row; the Future resolves to its probability row.
+        After close() (the active model changed) the row is scored directly.
+        """
+        future = Future()
+        row = np.asarray(row, dtype=np.float32).reshape(1, -1)
+        with self._close_lock:
+            if not self._closed:
+                self._queue.put((row, future))
+                return future
+        try:
+            future.set_result(self.predict_fn(row)[0])
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def predict(self, row, timeout=5.0):
+        return self.submit(row).result(timeout=timeout)
+
+    def close(self):
+        """
+        Stop the worker thread once queued rows are scored
+        """
+        with self._close_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Re-queue the stop signal for after this batch
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            try:
+                self._score_batch(batch)
+            except Exception as e:
+                # One bad batch must not stop the worker every later request waits on
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _score_batch(self, batch):
+        # Claim each future; callers that timed out have cancelled theirs
+        claimed = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+        if not claimed:
+            return
+        rows, futures = zip(*claimed)
+        try:
+            proba = self.predict_fn(np.vstack(rows))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, row_proba in zip(futures, proba):
+            future.set_result(row_proba)
+
+
+_active_lock = threading.Lock()
+_active = {'key': None, 'record': None, 'predictor': None, 'batcher': None}
+
+
+def _active_model_key():
+    return (PredictionModel.objects.filter(is_active=True, model_file__gt='')
+            .order_by('-created_at').values_list('id', 'model_file').first())
+
+
+def get_active_predictor():
+    """
+    (PredictionModel, predictor, batcher) for the active model, loading it on first
+    use or when the active model changes. All three are None without an active model.
+    """
+    key = _active_model_key()
+    if key == _active['key']:
+        return _active['record'], _active['predictor'], _active['batcher']
+
+    with _active_lock:
+        if key != _active['key']:
+            record = predictor = batcher = None
+            if key is not None:
+                # scikit-learn is only needed once a model is loaded
+                from .ml_model import StudentPerformancePredictor
+                record = PredictionModel.objects.get(id=key[0])
+                predictor = StudentPerformancePredictor()
+                predictor.load_model(record.model_file.path)
+                if getattr(settings, 'ML_MICROBATCH_ENABLED', True):
+                    batcher = MicroBatcher(
+                        predictor.predict_proba,
+                        max_wait=getattr(settings, 'ML_MICROBATCH_WAIT_MS', 2) / 1000,
+                        max_batch=getattr(settings, 'ML_MICROBATCH_MAX_SIZE', 64),
+                    )
+            if _active['batcher'] is not None:
+                _active['batcher'].close()
+            _active.update(key=key, record=record, predictor=predictor, batcher=batcher)
+        return _active['record'], _active['predictor'], _active['batcher']
+
+
+def _reset_after_fork():
+    """
+    A forked worker (gunicorn --preload) inherits the parent's active-model
+    cache but not its threads: drop the batcher whose worker thread did not
+    survive, the executor and any lock held at fork time. The model is
+    reloaded on first use (or by the worker's own warm-up).
+    """
+    global _active_lock, _executor_lock, _executor
+    _active_lock = threading.Lock()
+    _active.update(key=None, record=None, predictor=None, batcher=None)
+    _executor_lock = threading.Lock()
+    _executor = None
+
+
+def rule_contributions(row):
+    """
+    Points each feature adds to the rule-based weighted score
+    """
+    contributions = {}
+    for col, value in zip(FEATURE_COLUMNS, row):
+        weight, full_marks = RULE_WEIGHTS[col]
+        contributions[col] = float(np.clip(value / full_marks * 100, 0, 100) * weight)
+    return contributions
+
+
+# Seconds to wait for a micro-batch before scoring the row directly
+BATCH_TIMEOUT = 5.0
+
+
+_executor_lock = threading.Lock()
+_executor = None
+
+
+def inference_executor():
+    """
+    Bounded thread pool (settings.ML_INFERENCE_THREADS) for CPU-bound scoring from async views
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ML_INFERENCE_THREADS', 4),
+                    thread_name_prefix='inference',
+                )
+    return _executor
+
+
+def score_features(features):
+    """
+    Score one student's features (dict or Student-like mapping) against the active model
+    """
+    return _score(features, *get_active_predictor())
+
+
+async def ascore_features(features):
+    """
+    Async score_features: the active-model lookup runs on the sync ORM thread.
+    Rows are handed to the micro-batcher straight from the event loop, so any
+    number of concurrent requests can share a batch; the bounded inference pool
+    only runs unbatched predict_proba calls and the per-row explanation.
+    """
+    record, predictor, batcher = await sync_to_async(get_active_predictor)()
+    row = to_feature_matrix([features])
+    if predictor is None or predictor.pipeline is None:
+        return _rule_result(row)
+
+    loop = asyncio.get_running_loop()
+    proba = None
+    if batcher is not None:
+        try:
+            proba = await asyncio.wait_for(asyncio.wrap_future(batcher.submit(row)), BATCH_TIMEOUT)
+        except asyncio.TimeoutError:
+            proba = None
+    if proba is None:
+        proba = (await loop.run_in_executor(inference_executor(), predictor.predict_proba, row))[0]
+    return await loop.run_in_executor(inference_executor(), _model_result, row, proba, record, predictor)
+
+
+def _rule_result(row):
+    label = str(rule_labels(row)[0])
+    filled = np.where(np.isnan(row[0]), FEATURE_DEFAULTS, row[0])
+    return {
+        'prediction': label,
+        'is_at_risk': label in ['at_risk', 'poor'],
+        'confidence': 0.70,
+        'probabilities': {},
+        'contributions': rule_contributions(filled),
+        'model': None,
+    }
+
+
+def _score(features, record, predictor, batcher):
+    row = to_feature_matrix([features])
+
+    if predictor is None or predictor.pipeline is None:
+        return _rule_result(row)
+
+    proba = None
+    if batcher is not None:
+        try:
+            proba = batcher.predict(row, timeout=BATCH_TIMEOUT)
+        except FutureTimeoutError:
+            proba = None
+    if proba is None:
+        proba = predictor.predict_proba(row)[0]
+    return _model_result(row, proba, record, predictor)
+
+
+def _model_result(row, proba, record, predictor):
+    classes = predictor.pipeline.classes_
+    best = int(np.argmax(proba))
+    label = str(classes[best])
+    return {
+        'prediction': label,
+        'is_at_risk': label in ['at_risk', 'poor'],
+        'confidence': float(proba[best]),
+        'probabilities': {str(cls): float(p) for cls, p in zip(classes, proba)},
+        'contributions': predictor.feature_contributions(row, class_index=best),
+        'model': {'id': record.id, 'name': record.name, 'algorithm': record.algorithm},
+    }
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
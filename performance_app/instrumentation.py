@@ -0,0 +1,219 @@
+# performance_app/instrumentation.py
+"""
+Per-request performance metrics.
+
+RequestMetricsMiddleware counts every request and its latency. A sampled
+fraction of requests (settings.PERF_METRICS_SAMPLE_RATE) is also measured in
+detail: database queries and time (through a connection execute_wrapper),
+feature-store cache hits and misses, and time spent in instrumented sections
+such as predict_batch and generate_charts. Sampled responses carry a
+Server-Timing header, and everything is aggregated into Prometheus metrics
+served at /metrics.
+"""
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+)
+
+from .profiling import span
+
+REQUESTS = Counter(
+    'performance_requests_total', 'HTTP requests handled', ['view', 'method', 'status'],
+)
+REQUEST_SECONDS = Histogram(
+    'performance_request_seconds', 'Request wall time', ['view'],
+)
+DB_QUERIES = Histogram(
+    'performance_request_db_queries', 'Database queries per sampled request', ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_SECONDS = Histogram(
+    'performance_request_db_seconds', 'Database time per sampled request', ['view'],
+)
+CACHE_REQUESTS = Counter(
+    'performance_cache_requests_total', 'Cache lookups in sampled requests', ['cache', 'result'],
+)
+SECTION_SECONDS = Histogram(
+    'performance_section_seconds', 'Time in instrumented sections of sampled requests', ['section'],
+)
+
+_current = ContextVar('performance_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Measurements collected while one sampled request is handled
+    """
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache = {}      # (cache, result) -> count
+        self.sections = {}   # section -> seconds
+
+    def server_timing(self, total_seconds):
+        """
+        Server-Timing header value (durations in milliseconds)
+        """
+        entries = [
+            f'total;dur={total_seconds * 1000:.1f}',
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+        ]
+        for section, seconds in self.sections.items():
+            entries.append(f'{section};dur={seconds * 1000:.1f}')
+        for (name, result), count in sorted(self.cache.items()):
+            entries.append(f'cache-{name}-{result};desc="{count}"')
+        return ', '.join(entries)
+
+
+def current_metrics():
+    """
+    RequestMetrics of the sampled request being handled, else None
+    """
+    return _current.get()
+
+
+def _sample_rate():
+    return getattr(settings, 'PERF_METRICS_SAMPLE_RATE', 0.1)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_seconds += time.perf_counter() - start
+        metrics.db_queries += 1
+
+
+@receiver(connection_created)
+def _install_query_wrapper(sender, connection, **kwargs):
+    # Installed on every connection, so queries that async views run on the
+    # ORM thread are counted too; outside a sampled request it is a no-op
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def count_cache(name, hit):
+    """
+    Record a hit or miss of cache ``name`` against the current sampled request
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        key = (name, 'hit' if hit else 'miss')
+        metrics.cache[key] = metrics.cache.get(key, 0) + 1
+
+
+@contextmanager
+def section(name):
+    """
+    Time a block against the current sampled request; it is also a profiling
+    span (see performance_app.profiling)
+    """
+    metrics = _current.get()
+    if metrics is None:
+        with span(name):
+            yield
+        return
+    start = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        metrics.sections[name] = metrics.sections.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed_section(name):
+    """
+    Decorator form of section()
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else '<unresolved>'
+
+
+class RequestMetricsMiddleware:
+    """
+    Counts every request; measures and annotates a sampled fraction of them
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        sampled = random.random() < _sample_rate()
+        metrics = RequestMetrics() if sampled else None
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def _finish(self, request, response, metrics, start):
+        elapsed = time.perf_counter() - start
+        view = _view_name(request)
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        REQUEST_SECONDS.labels(view).observe(elapsed)
+        if metrics is not None:
+            DB_QUERIES.labels(view).observe(metrics.db_queries)
+            DB_SECONDS.labels(view).observe(metrics.db_seconds)
+            for (name, result), count in metrics.cache.items():
+                CACHE_REQUESTS.labels(name, result).inc(count)
+            for name, seconds in metrics.sections.items():
+                SECTION_SECONDS.labels(name).observe(seconds)
+            response['Server-Timing'] = metrics.server_timing(elapsed)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+
+def metrics_payload():
+    """
+    (body, content type) of the Prometheus exposition; aggregates all worker
+    processes when PROMETHEUS_MULTIPROC_DIR is set
+    """
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,49 @@
+# performance_app/lazy.py
+"""
+Deferred imports for heavy dependencies (pandas, scikit-learn, matplotlib,
+reportlab), so worker boot and manage.py commands only pay for them when a
+request or command actually uses them.
+"""
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module placeholder that imports the real module on first attribute access
+    """
+
+    def __init__(self, name, package=None):
+        super().__init__(name)
+        self.__dict__['_lazy_package'] = package
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = importlib.import_module(self.__name__, self.__dict__['_lazy_package'])
+            self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name, package=None):
+    """
+    ``lazy_import('pandas')`` / ``lazy_import('.ml_model', __package__)``
+    """
+    return LazyModule(name, package)
+
+
+def pyplot():
+    """
+    matplotlib.pyplot with the non-interactive Agg backend
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
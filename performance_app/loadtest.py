@@ -0,0 +1,92 @@
+# performance_app/loadtest.py
+"""
+Local load test: sync WSGI vs. ASGI throughput for the read-heavy endpoints.
+
+Start the same project twice, e.g.
+
+    python manage.py runserver 8000 --noreload                    # WSGI
+    daphne -p 8001 student_performance.asgi:application           # ASGI
+
+then compare:
+
+    python -m performance_app.loadtest --username admin --password admin123 \\
+        --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_PATHS = ['/', '/api/performance-distribution/', '/api/predict/?student_id=S1001']
+
+
+def login(base_url, username, password):
+    """
+    Authenticated session (the login view takes Student/Instructor ID or 'admin')
+    """
+    session = requests.Session()
+    session.get(f'{base_url}/login/')
+    response = session.post(
+        f'{base_url}/login/',
+        data={'username': username, 'password': password,
+              'csrfmiddlewaretoken': session.cookies.get('csrftoken', '')},
+        headers={'Referer': f'{base_url}/login/'},
+        allow_redirects=False,
+    )
+    if 'sessionid' not in session.cookies:
+        raise SystemExit(f'Login failed on {base_url} (HTTP {response.status_code})')
+    return session.cookies.get_dict()
+
+
+def run(base_url, path, cookies, concurrency, total_requests):
+    """
+    Fire ``total_requests`` GETs with ``concurrency`` workers; returns a result dict
+    """
+    def fetch(_):
+        start = time.perf_counter()
+        response = requests.get(f'{base_url}{path}', cookies=cookies, allow_redirects=False)
+        return time.perf_counter() - start, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(fetch, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, status in samples if status >= 400)
+    return {
+        'path': path,
+        'requests': total_requests,
+        'errors': errors,
+        'rps': total_requests / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True, help='name=base_url, repeatable')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--path', action='append', help='Endpoint to hit, repeatable')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    print(f"{'server':<8} {'path':<40} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for target in args.target:
+        name, _, base_url = target.partition('=')
+        base_url = base_url.rstrip('/')
+        cookies = login(base_url, args.username, args.password)
+        for path in paths:
+            result = run(base_url, path, cookies, args.concurrency, args.requests)
+            print(f"{name:<8} {path:<40} {result['rps']:8.1f} {result['p50_ms']:8.1f} "
+                  f"{result['p99_ms']:8.1f} {result['errors']:7d}")
+
+
+if __name__ == '__main__':
+    main()
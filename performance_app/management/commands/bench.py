@@ -0,0 +1,166 @@
+# performance_app/management/commands/bench.py
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+import numpy as np
+import sklearn
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from performance_app import bench_suite, benchmarks
+
+SUITES = ('login', 'views', 'import', 'database', 'training', 'prediction', 'charts', 'startup')
+DEFAULT_SUITES = ('login', 'views', 'import', 'database', 'training', 'prediction', 'charts')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _database_version():
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version
+    if connection.vendor == 'postgresql':
+        return connection.pg_version
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the application benchmark suite against a throwaway database filled with "
+        "synthetic instructors, courses and students, and write the results as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1000, help='Synthetic students (1k to 5M)')
+        parser.add_argument('--courses', type=int, default=None,
+                            help=f'Courses (default: one per {bench_suite.BENCH_STUDENTS_PER_COURSE} students)')
+        parser.add_argument('--suites', default=','.join(DEFAULT_SUITES),
+                            help=f"Comma-separated subset of {', '.join(SUITES)}")
+        parser.add_argument('--algorithms', default=','.join(bench_suite.BENCH_ALGORITHMS),
+                            help='Algorithms for the training suite')
+        parser.add_argument('--train-rows', type=int, default=20000, help='Rows used for training benchmarks')
+        parser.add_argument('--import-rows', type=int, default=50, help='Rows in the CSV import benchmark')
+        parser.add_argument('--repeats', type=int, default=3, help='Requests per page (median is reported)')
+        parser.add_argument('--db-name', default=None,
+                            help='Benchmark database name; a file on SQLite (default: in-memory), '
+                                 'otherwise test_<NAME>. Set DATABASE_URL to benchmark PostgreSQL')
+        parser.add_argument('--output', default=None,
+                            help='JSON results path (default: MEDIA_ROOT/benchmarks/bench_<commit>_<scale>.json)')
+        parser.add_argument('--compare', metavar='BASELINE_JSON', help='Print timings relative to a previous run')
+
+    def handle(self, *args, **options):
+        suites = [suite.strip() for suite in options['suites'].split(',') if suite.strip()]
+        unknown = set(suites) - set(SUITES)
+        if unknown:
+            raise CommandError(f"Unknown suites: {', '.join(sorted(unknown))}")
+        if options['scale'] < 1:
+            raise CommandError('--scale must be positive')
+
+        commit = _git_commit()
+        output = options['output'] or os.path.join(
+            settings.MEDIA_ROOT, 'benchmarks', f"bench_{commit or 'unknown'}_{options['scale']}.json"
+        )
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['results']
+
+        results = []
+        started = time.perf_counter()
+        if 'startup' in suites:
+            # Fresh interpreter: unaffected by the benchmark database
+            results.append(benchmarks.bench_startup_imports())
+
+        setup_test_environment()
+        if options['db_name']:
+            connection.settings_dict['TEST']['NAME'] = options['db_name']
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        database_version = _database_version()
+        try:
+            # Uploads, feature-store files and models go to a scratch MEDIA_ROOT
+            with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+                results.extend(self._run(suites, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': commit,
+                'scale': options['scale'],
+                'suites': suites,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'seconds': round(time.perf_counter() - started, 1),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'numpy': np.__version__,
+                'sklearn': sklearn.__version__,
+                'database': connection.vendor,
+                'database_version': database_version,
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'cpu_count': os.cpu_count(),
+                'platform': sys.platform,
+            },
+            'results': results,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=1, default=str)
+        self.stdout.write(f"Wrote {len(results)} results to {output}")
+
+        if baseline is not None:
+            self._compare(baseline, results)
+
+    def _run(self, suites, options):
+        start = time.perf_counter()
+        summary = bench_suite.populate_synthetic_db(options['scale'], n_courses=options['courses'])
+        self.stdout.write(
+            f"Populated {summary['students']} students, {summary['courses']} courses, "
+            f"{summary['instructors']} instructors in {time.perf_counter() - start:.1f}s"
+        )
+        results = [{'benchmark': 'populate', 'rows': summary['students'],
+                    'seconds': round(time.perf_counter() - start, 3)}]
+
+        logins = summary['logins']
+        if 'login' in suites:
+            results.extend(bench_suite.bench_login(logins, stdout=self.stdout))
+        if 'views' in suites:
+            results.extend(bench_suite.bench_views(logins, repeats=options['repeats'], stdout=self.stdout))
+        if 'import' in suites:
+            results.extend(bench_suite.bench_csv_import(options['import_rows'], stdout=self.stdout))
+        if 'database' in suites:
+            results.extend(bench_suite.bench_database(stdout=self.stdout))
+
+        features = None
+        if {'training', 'prediction', 'charts'} & set(suites):
+            features = bench_suite.all_course_features()
+        if 'training' in suites:
+            algorithms = [name.strip() for name in options['algorithms'].split(',') if name.strip()]
+            results.extend(bench_suite.bench_training(features, algorithms, max_rows=options['train_rows'],
+                                                       stdout=self.stdout))
+        if 'prediction' in suites:
+            results.extend(bench_suite.bench_batch_prediction(features, train_rows=options['train_rows'],
+                                                               stdout=self.stdout))
+        if 'charts' in suites:
+            results.extend(bench_suite.bench_charts(features, stdout=self.stdout))
+        return results
+
+    def _compare(self, baseline, results):
+        self.stdout.write('\nvs. baseline (ratio > 1 is slower):')
+        for key, before, after, ratio in bench_suite.compare_results(baseline, results):
+            label = ' '.join(str(value) for _, value in key)
+            marker = '  <-- slower' if ratio > 1.2 else ''
+            self.stdout.write(f"  {label:<60} {before:9.4f}s -> {after:9.4f}s  x{ratio:5.2f}{marker}")
@@ -0,0 +1,77 @@
+# performance_app/management/commands/prune_models.py
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from performance_app.ml_model import read_artefact
+from performance_app.models import PredictionModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Report size and load time of every model artefact in MEDIA_ROOT/models and "
+        "delete artefacts not referenced by a PredictionModel, keeping the newest "
+        "ML_MODEL_RETENTION unreferenced ones"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int, default=None,
+            help='Unreferenced artefacts to keep (default: settings.ML_MODEL_RETENTION)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report only, delete nothing')
+        parser.add_argument('--no-load', action='store_true', help='Skip loading artefacts (no load time)')
+
+    def handle(self, *args, **options):
+        keep = options['keep'] if options['keep'] is not None else getattr(settings, 'ML_MODEL_RETENTION', 5)
+        models_dir = os.path.join(settings.MEDIA_ROOT, 'models')
+        if not os.path.isdir(models_dir):
+            self.stdout.write('No model artefacts found.')
+            return
+
+        referenced = {
+            os.path.normpath(os.path.join(settings.MEDIA_ROOT, str(name)))
+            for name in PredictionModel.objects.exclude(model_file='').values_list('model_file', flat=True)
+            if name
+        }
+
+        paths = [
+            os.path.join(models_dir, name) for name in os.listdir(models_dir)
+            if name.endswith('.joblib')
+        ]
+        # Newest first
+        paths.sort(key=os.path.getmtime, reverse=True)
+
+        unreferenced_seen = 0
+        total_freed = 0
+        for path in paths:
+            size_kb = os.path.getsize(path) / 1024
+            is_referenced = os.path.normpath(path) in referenced
+
+            details = ''
+            if not options['no_load']:
+                try:
+                    _, manifest, load_seconds = read_artefact(path)
+                    details = (
+                        f"load={load_seconds * 1000:8.1f}ms schema=v{manifest['schema_version']} "
+                        f"algorithm={manifest.get('algorithm', '?')}"
+                    )
+                except Exception as e:
+                    details = f"load failed: {e}"
+
+            if is_referenced:
+                action = 'referenced'
+            else:
+                unreferenced_seen += 1
+                action = 'kept' if unreferenced_seen <= keep else 'pruned'
+
+            self.stdout.write(f"{os.path.basename(path):<45} {size_kb:10.1f}KB {details} [{action}]")
+
+            if action == 'pruned':
+                total_freed += size_kb
+                if not options['dry_run']:
+                    os.remove(path)
+
+        verb = 'Would free' if options['dry_run'] else 'Freed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total_freed:.1f}KB from {models_dir}"))
@@ -0,0 +1,66 @@
+# performance_app/management/commands/snapshot_students.py
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from performance_app.ml_model import STREAMING_ALGORITHMS, StudentPerformancePredictor
+from performance_app.model_refresh import register_model
+from performance_app.snapshot import LABELS, load_snapshot, refresh_snapshot, snapshot_dir, training_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the memory-mapped student snapshot in MEDIA_ROOT/snapshots/students "
+        "(incremental on updated_at) and optionally train and register a model straight from it"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Discard the snapshot and export every row')
+        parser.add_argument('--chunk-size', type=int, default=50000, help='Rows fetched per database round trip')
+        parser.add_argument(
+            '--train', metavar='ALGORITHM',
+            help="Train on the snapshot after refreshing (e.g. 'auto', 'random_forest') and save "
+                 "the model as the active PredictionModel"
+        )
+        parser.add_argument('--no-activate', action='store_true',
+                            help='Register the trained model without making it the active one')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = refresh_snapshot(rebuild=options['rebuild'], chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f"Snapshot {snapshot_dir()}: {stats['rows']} rows "
+            f"({stats['appended']} appended, {stats['patched']} patched, {stats['deleted']} deleted) "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+        if options['train']:
+            snapshot = load_snapshot()
+            live = np.asarray(snapshot.live)
+            start = time.perf_counter()
+            predictor = StudentPerformancePredictor()
+            if options['train'] in STREAMING_ALGORITHMS:
+                # Out-of-core: never materialises more than one chunk
+                metrics, features = predictor.train_streaming(
+                    training_chunks(snapshot, options['chunk_size']), options['train']
+                )
+            else:
+                actual = np.asarray(snapshot.actual)[live]
+                # Use recorded outcomes only when every live row has one
+                labels = np.array(LABELS, dtype=object)[actual] if live.any() and actual.all() else None
+                metrics, features = predictor.train_model(snapshot.X[live], options['train'], labels=labels)
+            self.stdout.write(
+                f"Trained {predictor.manifest['algorithm']} on {int(live.sum())} rows "
+                f"in {time.perf_counter() - start:.2f}s: {metrics}"
+            )
+            record = register_model(
+                predictor, metrics, features, 'Snapshot Model', activate=not options['no_activate'],
+                # Refreshes continue from the rows this snapshot contained
+                training_watermark=parse_datetime(snapshot.watermark) if snapshot.watermark else None,
+            )
+            self.stdout.write(
+                f"Registered PredictionModel {record.id} ({record.model_file})"
+                f"{' as the active model' if record.is_active else ''}"
+            )
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_app', '0005_instructor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='evaluation',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
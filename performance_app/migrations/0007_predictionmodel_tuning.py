@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_app', '0006_predictionmodel_evaluation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='tuning',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 07:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_app', '0007_predictionmodel_tuning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refreshes', to='performance_app.predictionmodel'),
+        ),
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='training_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='training_watermark',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
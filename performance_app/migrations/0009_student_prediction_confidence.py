@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_app', '0008_predictionmodel_lineage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='prediction_confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='prediction_model',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+# students_list searches with icontains, which PostgreSQL runs as
+# UPPER(column::text) LIKE UPPER('%...%'); trigram indexes on the same
+# expressions let it avoid a sequential scan. Other backends skip them.
+SEARCH_COLUMNS = ('student_id', 'first_name', 'last_name', 'email')
+
+
+def _create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS student_{column}_trgm_idx ON performance_app_student '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def _drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS student_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_app', '0009_student_prediction_confidence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['course', 'updated_at'], name='student_course_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['updated_at'], name='student_updated_idx'),
+        ),
+        migrations.RunPython(_create_search_indexes, _drop_search_indexes),
+    ]
@@ -1,117 +1,413 @@
 # performance_app/ml_model.py
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, ParameterSampler, StratifiedKFold, cross_validate
+from scipy.stats import loguniform, randint
+from sklearn.preprocessing import StandardScaler
+from sklearn.impute import SimpleImputer
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, confusion_matrix
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.svm import SVC, LinearSVC
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.kernel_approximation import Nystroem
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+from threadpoolctl import threadpool_limits
+import sklearn
 import joblib
+import hashlib
+import math
 import os
+import time
+from datetime import datetime
 from django.conf import settings
 
+from .instrumentation import timed_section
+from .profiling import profiled, span
+from .tree_inference import CompiledTreeModel, supports_compilation
+# Feature schema and rule engine live in the dependency-light features module
+from .features import FEATURE_COLUMNS, FEATURE_DEFAULTS, FEATURE_SCHEMA, rule_labels, to_feature_matrix
+
+# Bump when the layout of saved artefacts changes
+ARTEFACT_SCHEMA_VERSION = 2
+
+# Fitted attributes only used for training diagnostics; dropped from saved artefacts
+DIAGNOSTIC_ATTRIBUTES = ('train_score_', 'validation_score_', 'oob_improvement_', 'oob_scores_')
+
+# Defaults for ML_TRAINING_RESOURCES (see settings.py)
+# While CV folds run in parallel the estimator's n_jobs is reduced so both
+# levels together use about as many workers as there are cores (split_cores)
+DEFAULT_TRAINING_RESOURCES = {
+    'n_jobs': -1,          # estimator-level parallelism (RandomForest trees)
+    'cv_n_jobs': -1,       # parallel cross-validation folds
+    'blas_threads': None,  # BLAS/OpenMP thread-pool cap, None = library default
+}
+
+
+# Above this many rows the exact GradientBoosting/SVC/RandomForest fits get slow;
+# 'auto' picks the histogram-based booster instead
+LARGE_DATASET_ROWS = 100000
+
+
+# Above this many rows 'svm' trains the kernel-approximation SVM ('svm_approx'):
+# exact SVC(probability=True) scales quadratically or worse and refits 5x for calibration
+SVM_EXACT_MAX_ROWS = 20000
+
+# 'svm_approx' calibrates with 3-fold CV inside every evaluation fold; below
+# this many rows in the smallest class it falls back to exact 'svm'
+SVM_APPROX_MIN_CLASS_ROWS = 10
+
+
+# Algorithms that can be trained chunk by chunk (train_streaming)
+STREAMING_ALGORITHMS = ('sgd',)
+
+
+# Algorithms refresh_model can update in place: extra trees/stages via
+# warm_start, or more partial_fit passes
+WARM_START_ALGORITHMS = ('random_forest', 'gradient_boosting', 'hist_gradient_boosting', 'sgd')
+
+
+# HalvingRandomSearchCV spaces per algorithm (pipeline parameter names)
+TUNING_SPACES = {
+    'random_forest': {
+        'model__n_estimators': randint(50, 400),
+        'model__max_depth': [None, 8, 12, 20],
+        'model__min_samples_leaf': randint(1, 10),
+        'model__max_features': ['sqrt', 'log2', None],
+    },
+    'decision_tree': {
+        'model__max_depth': [None, 4, 6, 8, 12, 16],
+        'model__min_samples_leaf': randint(1, 20),
+        'model__criterion': ['gini', 'entropy'],
+    },
+    'logistic_regression': {
+        'model__C': loguniform(1e-3, 1e2),
+    },
+    'svm': {
+        'model__C': loguniform(1e-2, 1e2),
+        'model__gamma': loguniform(1e-3, 1e0),
+    },
+    'svm_approx': {
+        'model__nystroem__gamma': loguniform(1e-3, 1e0),
+        'model__svc__estimator__C': loguniform(1e-2, 1e2),
+    },
+    'gradient_boosting': {
+        'model__n_estimators': randint(50, 300),
+        'model__learning_rate': loguniform(0.01, 0.3),
+        'model__max_depth': randint(2, 6),
+        'model__subsample': [0.7, 0.85, 1.0],
+    },
+    'hist_gradient_boosting': {
+        'model__learning_rate': loguniform(0.02, 0.3),
+        'model__max_leaf_nodes': randint(15, 64),
+        'model__min_samples_leaf': randint(10, 60),
+        'model__l2_regularization': loguniform(1e-4, 1.0),
+    },
+    'sgd': {
+        'model__alpha': loguniform(1e-6, 1e-2),
+    },
+}
+TUNING_FACTOR = 3
+# _tune times this many sampled candidates on the first sample size, then the
+# slowest on the second, to estimate the cost of one fit
+TUNING_PROBE_CANDIDATES = 3
+TUNING_PROBE_ROWS = (100, 400)
+# Share of the budget left after the probe that the estimated fits may use
+TUNING_BUDGET_SHARE = 0.8
+
+
+def recommend_algorithm(n_rows):
+    """
+    Recommended algorithm for a dataset of ``n_rows`` rows
+    """
+    return 'hist_gradient_boosting' if n_rows >= LARGE_DATASET_ROWS else 'random_forest'
+
+
+def resolve_algorithm(algorithm, n_rows, min_class_count=None):
+    """
+    Concrete algorithm trained for ``algorithm`` on ``n_rows`` rows ('auto',
+    large-data 'svm', 'svm_approx' with too few rows per class to calibrate)
+    """
+    if algorithm == 'auto':
+        return recommend_algorithm(n_rows)
+    if algorithm == 'svm' and n_rows > getattr(settings, 'ML_SVM_EXACT_MAX_ROWS', SVM_EXACT_MAX_ROWS):
+        algorithm = 'svm_approx'
+    if algorithm == 'svm_approx' and min_class_count is not None and min_class_count < SVM_APPROX_MIN_CLASS_ROWS:
+        return 'svm'
+    return algorithm
+
+
+def halving_seconds(rounds, max_resources, min_resources, cv_folds, workers, fit_seconds):
+    """
+    Estimated wall time of a HalvingRandomSearchCV with TUNING_FACTOR ** rounds
+    candidates and min_resources='exhaust': iteration i fits
+    TUNING_FACTOR ** (rounds - i) candidates per CV fold on
+    min_resources * TUNING_FACTOR ** i rows, ``workers`` fits at a time.
+    ``fit_seconds(rows)`` is the cost of one fit.
+    """
+    min_resources = max(min_resources, max_resources // TUNING_FACTOR ** rounds)
+    total = 0.0
+    for iteration in range(rounds + 1):
+        fits = TUNING_FACTOR ** (rounds - iteration) * cv_folds
+        rows = min(min_resources * TUNING_FACTOR ** iteration, max_resources) * (cv_folds - 1) / cv_folds
+        total += math.ceil(fits / workers) * fit_seconds(rows)
+    return total
+
+
+def get_training_resources(overrides=None):
+    """
+    Resolve training resources: defaults < settings.ML_TRAINING_RESOURCES < overrides
+    """
+    resources = dict(DEFAULT_TRAINING_RESOURCES)
+    resources.update(getattr(settings, 'ML_TRAINING_RESOURCES', {}) or {})
+    if overrides:
+        resources.update({key: value for key, value in overrides.items() if value is not None})
+    return resources
+
+
+def split_cores(n_jobs, cv_n_jobs, parallel_fits):
+    """
+    (estimator n_jobs, CV n_jobs) for ``parallel_fits`` fold fits: when the
+    folds run in parallel, each fold's estimator gets its share of n_jobs
+    instead of every fold spawning n_jobs workers of its own
+    """
+    cv_workers = min(joblib.effective_n_jobs(cv_n_jobs), max(1, parallel_fits))
+    if cv_workers <= 1:
+        return n_jobs, cv_n_jobs
+    return max(1, joblib.effective_n_jobs(n_jobs) // cv_workers), cv_workers
+
+
+def set_n_jobs(pipeline, n_jobs):
+    """
+    Set every n_jobs parameter of a pipeline (including nested estimators)
+    """
+    pipeline.set_params(**{key: n_jobs for key in pipeline.get_params() if key.endswith('n_jobs')})
+
+
+def training_data_hash(X, y):
+    """
+    SHA-256 of the training matrix and labels, recorded in the artefact manifest
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+    digest.update('\x1f'.join(map(str, y)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def csv_chunks(csv_file_path, chunk_size=100000):
+    """
+    Chunk source for train_streaming: a callable yielding (X, y) per CSV chunk.
+    y comes from a performance_category column when present, otherwise None.
+    """
+    def chunks():
+        for df in pd.read_csv(csv_file_path, chunksize=chunk_size):
+            y = df['performance_category'].to_numpy() if 'performance_category' in df.columns else None
+            yield to_feature_matrix(df), y
+    return chunks
+
+
+def metrics_from_confusion(cm):
+    """
+    accuracy and weighted precision/recall/F1 from an accumulated confusion matrix
+    """
+    cm = np.asarray(cm, dtype=np.float64)
+    total = cm.sum()
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    true_positive = np.diag(cm)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.nan_to_num(true_positive / predicted)
+        recall = np.nan_to_num(true_positive / support)
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    weights = support / total if total else support
+    return {
+        'accuracy': float(true_positive.sum() / total) if total else 0.0,
+        'precision': float(precision @ weights),
+        'recall': float(recall @ weights),
+        'f1_score': float(f1 @ weights),
+    }
+
+
+def compact_pipeline(pipeline):
+    """
+    Shrink a fitted pipeline before saving: drop training diagnostics and store
+    linear coefficients and preprocessing statistics as float32
+    """
+    for _, step in pipeline.steps:
+        for attr in DIAGNOSTIC_ATTRIBUTES:
+            if isinstance(getattr(step, attr, None), np.ndarray):
+                delattr(step, attr)
+        # SVC's libsvm arrays must stay float64, so only plain linear models are cast
+        if isinstance(step, (LogisticRegression, SGDClassifier)):
+            step.coef_ = step.coef_.astype(np.float32)
+            step.intercept_ = step.intercept_.astype(np.float32)
+        elif isinstance(step, SimpleImputer):
+            step.statistics_ = step.statistics_.astype(np.float32)
+    return pipeline
+
+
+def artefact_compression():
+    """
+    joblib ``compress`` argument from settings.ML_MODEL_COMPRESSION (0 = off)
+    """
+    level = getattr(settings, 'ML_MODEL_COMPRESSION', 3)
+    method = getattr(settings, 'ML_MODEL_COMPRESSION_METHOD', 'zlib')
+    return (method, level) if level else 0
+
+
+def read_artefact(filepath):
+    """
+    Load an artefact and return (saved_data, manifest, load_seconds)
+    """
+    start = time.perf_counter()
+    saved_data = joblib.load(filepath)
+    load_seconds = time.perf_counter() - start
+    manifest = saved_data.get('manifest') or {'schema_version': 1}
+    return saved_data, manifest, load_seconds
+
+
 class StudentPerformancePredictor:
-    def __init__(self):
-        self.model = None
-        self.scaler = StandardScaler()
-        self.label_encoder = LabelEncoder()
-        self.feature_names = []
+    def __init__(self, resources=None):
+        self.pipeline = None
+        self.feature_names = list(FEATURE_COLUMNS)
+        self.feature_importance = {}
+        self.manifest = {}
+        self.evaluation = {}
+        self.tuning = {}
+        self.compiled = None
+        self.resources = get_training_resources(resources)
+
+    @property
+    def model_version(self):
+        """Short identifier of the fitted model: algorithm + training-data hash prefix"""
+        if not self.manifest:
+            return ''
+        return f"{self.manifest.get('algorithm') or 'model'}-{(self.manifest.get('training_data_hash') or '')[:12]}"
+
+    @property
+    def model(self):
+        """Fitted estimator (last pipeline step) or None"""
+        return self.pipeline.steps[-1][1] if self.pipeline is not None else None
+
+    def compile_trees(self):
+        """
+        Build the NumPy tree-inference path for RandomForest/DecisionTree pipelines.
+        Returns True if the pipeline could be compiled.
+        """
+        self.compiled = CompiledTreeModel(self.pipeline) if supports_compilation(self.pipeline) else None
+        return self.compiled is not None
+
+    @profiled('predict')
+    def predict_proba(self, X):
+        """
+        Class probabilities for a schema-ordered feature matrix; small batches
+        use the compiled tree path when available
+        """
+        max_rows = getattr(settings, 'ML_FAST_INFERENCE_MAX_ROWS', 1000)
+        if self.compiled is not None and len(X) <= max_rows:
+            return self.compiled.predict_proba(X)
+        return self.pipeline.predict_proba(X)
+
+    @property
+    def scaler(self):
+        """Fitted scaler step or None"""
+        return self.pipeline.named_steps.get('scaler') if self.pipeline is not None else None
+
+    def build_pipeline(self, estimator):
+        """
+        Imputer + scaler + estimator, fitted as one unit
+        """
+        return Pipeline([
+            ('imputer', SimpleImputer(strategy='mean')),
+            ('scaler', StandardScaler()),
+            ('model', estimator),
+        ])
         
     def prepare_features(self, df):
         """
-        Prepare features for training/prediction
+        Prepare features for training/prediction (float32 matrix, see to_feature_matrix)
         """
-        # Define feature columns
-        feature_cols = ['attendance', 'assignment_score', 'quiz_score', 
-                       'time_spent', 'forum_posts', 'resources_viewed']
-        
-        # Make sure all columns exist
-        for col in feature_cols:
-            if col not in df.columns:
-                # Provide default values if columns are missing
-                if col in ['attendance', 'assignment_score', 'quiz_score']:
-                    df[col] = 75.0  # Default average score
-                elif col == 'time_spent':
-                    df[col] = 30.0  # Default 30 hours
-                else:
-                    df[col] = 10  # Default count
-        
-        # Select features
-        X = df[feature_cols].copy()
-        self.feature_names = feature_cols
-        
-        # Handle missing values
-        X = X.fillna(X.mean() if len(X) > 0 else 0)
-        
-        return X
+        return to_feature_matrix(df)
     
-    def train_model(self, df, algorithm='random_forest'):
+    @profiled('train_model')
+    def train_model(self, df, algorithm='random_forest', resources=None, labels=None, tune=False,
+                    tune_budget=None):
         """
-        Train model on the provided dataframe
+        Train model on the provided dataframe (or schema-ordered feature matrix)
+
+        ``labels`` is an optional target aligned with ``df`` (e.g. a snapshot's
+        actual labels); it takes precedence over a performance_category column.
+
+        ``tune`` runs a successive-halving hyperparameter search first (see
+        _tune); ``tune_budget`` overrides settings.ML_TUNING_TIME_BUDGET.
+
+        ``resources`` overrides the predictor's training resources for this call
+        (keys: n_jobs, cv_n_jobs, blas_threads).
         """
+        resources = self._resolve_resources(resources)
+        n_jobs = resources['n_jobs']
+
         # Prepare features
-        feature_columns = ['attendance', 'assignment_score', 'quiz_score', 
-                          'time_spent', 'forum_posts', 'resources_viewed']
-        X = df[feature_columns]
+        with span('features'):
+            X = to_feature_matrix(df)
         
         # Create target variable
-        if 'performance_category' in df.columns:
+        if labels is not None:
+            y = labels
+        elif isinstance(df, pd.DataFrame) and 'performance_category' in df.columns:
             y = df['performance_category']
         else:
-            # Create a synthetic target for demonstration
-            # Calculate composite score
-            composite_score = (
-                df['attendance'].fillna(75) * 0.2 +
-                df['assignment_score'].fillna(75) * 0.3 +
-                df['quiz_score'].fillna(75) * 0.3 +
-                (df['time_spent'].fillna(30) / 60 * 100) * 0.1 +
-                (df['forum_posts'].fillna(10) / 20 * 100) * 0.05 +
-                (df['resources_viewed'].fillna(10) / 50 * 100) * 0.05
-            )
-            
-            # Create labels based on composite score
-            conditions = [
-                (composite_score >= 85),
-                (composite_score >= 70) & (composite_score < 85),
-                (composite_score >= 50) & (composite_score < 70),
-                (composite_score < 50)
-            ]
-            labels = ['excellent', 'good', 'average', 'poor']
-            y = pd.Series(np.select(conditions, labels, default='average'))
+            # Create a synthetic target for demonstration from the rule engine
+            y = rule_labels(X)
+        y = np.asarray(y)
         
         # Check class distribution
-        class_counts = y.value_counts()
+        _, class_counts = np.unique(y, return_counts=True)
         min_class_count = class_counts.min()
         
         # Determine optimal CV folds
         cv_folds = min(5, max(2, min_class_count)) if min_class_count >= 2 else None
         
-        # Scale features
-        self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X)
+        algorithm = resolve_algorithm(algorithm, len(X), min_class_count)
         
         # Initialize model based on algorithm
-        if algorithm == 'random_forest':
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        elif algorithm == 'decision_tree':
-            self.model = DecisionTreeClassifier(random_state=42)
-        elif algorithm == 'logistic_regression':
-            self.model = LogisticRegression(random_state=42, max_iter=1000)
-        elif algorithm == 'svm':
-            self.model = SVC(random_state=42, probability=True)
-        elif algorithm == 'gradient_boosting':
-            self.model = GradientBoostingClassifier(n_estimators=100, random_state=42)
-        else:
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.pipeline = self.build_pipeline(self.build_estimator(algorithm, n_jobs))
         
-        # Train the model
-        self.model.fit(X_scaled, y)
+        self.tuning = {}
         
-        # Calculate metrics
-        y_pred = self.model.predict(X_scaled)
+        # Cap BLAS/OpenMP threads for the whole search + CV + fit run
+        with threadpool_limits(limits=resources['blas_threads']):
+            if tune:
+                # The search fits several candidates per fold at once
+                estimator_jobs, cv_jobs = split_cores(n_jobs, resources['cv_n_jobs'],
+                                                      (cv_folds or 1) * TUNING_FACTOR)
+                set_n_jobs(self.pipeline, estimator_jobs)
+                with span('tune'):
+                    self.tuning = self._tune(X, y, algorithm, cv_folds, min_class_count, cv_jobs, tune_budget)
+            
+            # Held-out metrics from one parallel stratified CV run (k fits)
+            estimator_jobs, cv_jobs = split_cores(n_jobs, resources['cv_n_jobs'], cv_folds or 1)
+            set_n_jobs(self.pipeline, estimator_jobs)
+            with span('cv'):
+                evaluation = self._evaluate(X, y, cv_folds, min_class_count, cv_jobs)
+
+            # Final model: one fit on all data (imputation and scaling are fitted inside
+            # the pipeline), with all of the estimator's workers again
+            set_n_jobs(self.pipeline, n_jobs)
+            start = time.perf_counter()
+            with span('fit'):
+                self.pipeline.fit(X, y)
+            fit_seconds = time.perf_counter() - start
+            self.compiled = None
+
+            if evaluation is None:
+                # Too few samples per class to cross-validate: training-set metrics
+                y_pred = self.pipeline.predict(X)
+                evaluation = {'method': 'training_set', 'cv_folds': None, 'folds': [], 'y_pred': y_pred}
         
+        y_pred = evaluation.pop('y_pred')
         metrics = {
             'accuracy': accuracy_score(y, y_pred),
             'precision': precision_score(y, y_pred, average='weighted', zero_division=0),
@@ -119,128 +415,504 @@ class StudentPerformancePredictor:
             'f1_score': f1_score(y, y_pred, average='weighted', zero_division=0)
         }
         
-        # Only perform cross-validation if we have enough samples
-        if cv_folds and min_class_count >= 3:
-            try:
-                cv_scores = cross_val_score(self.model, X_scaled, y, cv=cv_folds)
-                metrics['cv_mean'] = cv_scores.mean()
-                metrics['cv_std'] = cv_scores.std()
-            except Exception as e:
-                print(f"Cross-validation failed: {e}")
-                metrics['cv_mean'] = None
-                metrics['cv_std'] = None
+        fold_scores = np.array([fold['accuracy'] for fold in evaluation['folds']])
+        if len(fold_scores):
+            metrics['cv_mean'] = fold_scores.mean()
+            metrics['cv_std'] = fold_scores.std()
         else:
             metrics['cv_mean'] = None
             metrics['cv_std'] = None
         
+        evaluation['final_fit_seconds'] = round(fit_seconds, 4)
+        self.evaluation = evaluation
+        
         # Get feature importance
-        if hasattr(self.model, 'feature_importances_'):
-            self.feature_importance = dict(zip(feature_columns, self.model.feature_importances_))
+        self.feature_importance = self._estimator_importance()
+        
+        self.manifest = {
+            'algorithm': algorithm,
+            'training_rows': int(len(X)),
+            'training_data_hash': training_data_hash(X, y),
+            'metrics': {key: (float(value) if value is not None else None) for key, value in metrics.items()},
+            'evaluation': evaluation,
+            'tuning': self.tuning,
+        }
+        
+        return metrics, list(FEATURE_COLUMNS)
+
+    def train_streaming(self, chunks, algorithm='sgd', classes=None, epochs=2):
+        """
+        Out-of-core training for data that does not fit in memory
+
+        ``chunks`` is a callable returning a fresh iterable of (X, y) pairs
+        (schema-ordered feature matrix, labels or None for rule labels), e.g.
+        csv_chunks() or snapshot.training_chunks(). The first pass fits the
+        imputer means and StandardScaler.partial_fit, then each epoch streams
+        the chunks through partial_fit. Metrics are progressive validation on
+        the last epoch: every chunk is scored before the model learns from it.
+        Memory use is bounded by the chunk size.
+        """
+        if algorithm not in STREAMING_ALGORITHMS:
+            raise ValueError(f"{algorithm} does not support streaming training; use one of {STREAMING_ALGORITHMS}")
+
+        def labelled(X, y):
+            return np.asarray(y) if y is not None else rule_labels(X)
+
+        # Pass 1: preprocessing statistics, label set and data hash
+        scaler = StandardScaler()
+        sums = np.zeros(len(FEATURE_COLUMNS))
+        counts = np.zeros(len(FEATURE_COLUMNS))
+        seen_classes = set()
+        digest = hashlib.sha256()
+        n_rows = 0
+        for X, y in chunks():
+            X = to_feature_matrix(X)
+            if not len(X):
+                continue
+            present = ~np.isnan(X)
+            sums += np.where(present, X, 0).sum(axis=0)
+            counts += present.sum(axis=0)
+            scaler.partial_fit(X)
+            digest.update(np.ascontiguousarray(X).tobytes())
+            if classes is None:
+                seen_classes.update(np.unique(labelled(X, y)).tolist())
+            n_rows += len(X)
+        if not n_rows:
+            raise ValueError("No training rows")
+
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), FEATURE_DEFAULTS)
+        imputer = SimpleImputer(strategy='mean').fit(means.reshape(1, -1))
+        classes = np.array(sorted(seen_classes) if classes is None else classes)
+
+        model = self.build_estimator(algorithm)
+        cm = np.zeros((len(classes), len(classes)), dtype=np.int64)
+        fitted = False
+        for epoch in range(epochs):
+            last_epoch = epoch == epochs - 1
+            for X, y in chunks():
+                X = to_feature_matrix(X)
+                if not len(X):
+                    continue
+                y = labelled(X, y)
+                if epoch == 0:
+                    # Same layout as training_data_hash: X bytes, then '\x1f'-joined labels
+                    digest.update(('\x1f' if fitted else '').encode('utf-8'))
+                    digest.update('\x1f'.join(map(str, y)).encode('utf-8'))
+                Xt = scaler.transform(imputer.transform(X))
+                if last_epoch and fitted:
+                    cm += confusion_matrix(y, model.predict(Xt), labels=classes)
+                model.partial_fit(Xt, y, classes=classes)
+                fitted = True
+
+        self.pipeline = Pipeline([('imputer', imputer), ('scaler', scaler), ('model', model)])
+        self.compiled = None
+
+        metrics = metrics_from_confusion(cm)
+        metrics['cv_mean'] = None
+        metrics['cv_std'] = None
+        self.feature_importance = self._estimator_importance()
+        self.tuning = {}
+        self.evaluation = {'method': 'progressive_validation', 'cv_folds': None, 'folds': [], 'epochs': epochs}
+        self.manifest = {
+            'algorithm': algorithm,
+            'training_rows': int(n_rows),
+            'training_data_hash': digest.hexdigest(),
+            'metrics': dict(metrics),
+            'evaluation': self.evaluation,
+        }
+        return metrics, list(FEATURE_COLUMNS)
+
+    def refresh_model(self, df, labels=None, extra_estimators=None):
+        """
+        Update the fitted model with new rows only, keeping its preprocessing.
+
+        RandomForest/GradientBoosting/HistGradientBoosting grow
+        ``extra_estimators`` more trees or stages (default: 10% more) fitted
+        on the new rows via warm_start; SGD continues with partial_fit.
+        Metrics score the new rows *before* the update, i.e. as held-out data.
+        Raises ValueError when the model cannot be refreshed and needs a full
+        retrain.
+        """
+        model = self.model
+        if model is None:
+            raise ValueError("No trained model to refresh")
+        
+        X = to_feature_matrix(df)
+        if labels is not None:
+            y = labels
+        elif isinstance(df, pd.DataFrame) and 'performance_category' in df.columns:
+            y = df['performance_category']
         else:
-            # For models without feature_importances_ (like SVM, LogisticRegression)
-            # Use coefficient magnitude as importance
-            if hasattr(self.model, 'coef_'):
-                importance = np.abs(self.model.coef_).mean(axis=0)
-                self.feature_importance = dict(zip(feature_columns, importance))
+            y = rule_labels(X)
+        y = np.asarray(y)
+        if not len(X):
+            raise ValueError("No new rows to refresh with")
+        
+        new_classes = set(np.unique(y).tolist())
+        known_classes = set(model.classes_.tolist())
+        if new_classes - known_classes:
+            raise ValueError(f"New classes {sorted(new_classes - known_classes)} need a full retrain")
+        
+        Xt = self.pipeline[:-1].transform(X)
+        y_pred = model.predict(Xt)
+        
+        start = time.perf_counter()
+        if isinstance(model, SGDClassifier):
+            model.partial_fit(Xt, y, classes=model.classes_)
+        elif isinstance(model, (RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier)):
+            # New trees/stages are fitted on the new rows only, and must see every class
+            if new_classes != known_classes:
+                raise ValueError(f"New rows lack classes {sorted(known_classes - new_classes)}; full retrain needed")
+            if isinstance(model, HistGradientBoostingClassifier):
+                current = model.n_iter_
+                extra = extra_estimators or max(10, current // 10)
+                # Diagnostics dropped by compact_pipeline are extended by warm start
+                for attr in ('train_score_', 'validation_score_'):
+                    if not hasattr(model, attr):
+                        setattr(model, attr, np.zeros(current + 1))
+                model.set_params(warm_start=True, max_iter=current + extra)
             else:
-                self.feature_importance = {feature: 1/len(feature_columns) for feature in feature_columns}
+                current = len(model.estimators_)
+                extra = extra_estimators or max(10, current // 10)
+                if isinstance(model, GradientBoostingClassifier) and not hasattr(model, 'train_score_'):
+                    model.train_score_ = np.zeros(current)
+                model.set_params(warm_start=True, n_estimators=current + extra)
+            model.fit(Xt, y)
+        else:
+            raise ValueError(f"{type(model).__name__} cannot be refreshed incrementally; retrain instead")
+        fit_seconds = time.perf_counter() - start
+        self.compiled = None
         
-        return metrics, feature_columns
+        metrics = {
+            'accuracy': accuracy_score(y, y_pred),
+            'precision': precision_score(y, y_pred, average='weighted', zero_division=0),
+            'recall': recall_score(y, y_pred, average='weighted', zero_division=0),
+            'f1_score': f1_score(y, y_pred, average='weighted', zero_division=0),
+            'cv_mean': None,
+            'cv_std': None,
+        }
+        self.feature_importance = self._estimator_importance()
+        self.evaluation = {
+            'method': 'refresh_holdout',
+            'cv_folds': None,
+            'folds': [],
+            'new_rows': int(len(X)),
+            'final_fit_seconds': round(fit_seconds, 4),
+        }
+        self.tuning = {}
+        parent_hash = self.manifest.get('training_data_hash')
+        self.manifest = {
+            'algorithm': self.manifest.get('algorithm'),
+            'training_rows': int(self.manifest.get('training_rows', 0)) + int(len(X)),
+            'training_data_hash': training_data_hash(X, y),
+            'refreshed_from': parent_hash,
+            'metrics': {key: (float(value) if value is not None else None) for key, value in metrics.items()},
+            'evaluation': self.evaluation,
+        }
+        return metrics, list(FEATURE_COLUMNS)
 
-    def create_synthetic_labels(self, df):
+    def feature_contributions(self, X, class_index=0):
         """
-        Create synthetic performance labels based on rules
+        Approximate per-feature contribution for the first row of X: the
+        standardised value times the class coefficient (logistic regression)
+        or times the feature importance (other models)
         """
-        # Calculate composite score
-        composite_score = (
-            df['attendance'].fillna(75) * 0.2 +
-            df['assignment_score'].fillna(75) * 0.3 +
-            df['quiz_score'].fillna(75) * 0.3 +
-            (df['time_spent'].fillna(30) / 60 * 100) * 0.1 +
-            (df['forum_posts'].fillna(10) / 20 * 100) * 0.05 +
-            (df['resources_viewed'].fillna(10) / 50 * 100) * 0.05
-        )
+        z = self.pipeline[:-1].transform(X)[0]
+        model = self.model
+        if isinstance(model, (LogisticRegression, SGDClassifier)):
+            weights = model.coef_[class_index if model.coef_.shape[0] > 1 else 0]
+        else:
+            importance = self.feature_importance or self._estimator_importance()
+            weights = np.array([importance.get(col, 0.0) for col in FEATURE_COLUMNS])
+        return {col: float(value) for col, value in zip(FEATURE_COLUMNS, z * weights)}
+
+    def _estimator_importance(self):
+        """
+        Feature importance of the fitted estimator
+        """
+        model = self.model
+        if hasattr(model, 'feature_importances_'):
+            importance = model.feature_importances_
+        elif hasattr(model, 'coef_'):
+            # For models without feature_importances_ (like SVM, LogisticRegression)
+            # Use coefficient magnitude as importance
+            importance = np.abs(model.coef_).mean(axis=0)
+        else:
+            importance = np.full(len(FEATURE_COLUMNS), 1 / len(FEATURE_COLUMNS))
+        return {feature: float(value) for feature, value in zip(FEATURE_COLUMNS, importance)}
+
+    def build_estimator(self, algorithm, n_jobs=None):
+        """
+        Unfitted estimator for ``algorithm``
+        """
+        if algorithm == 'random_forest':
+            return RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+        elif algorithm == 'decision_tree':
+            return DecisionTreeClassifier(random_state=42)
+        elif algorithm == 'logistic_regression':
+            return LogisticRegression(random_state=42, max_iter=1000)
+        elif algorithm == 'svm':
+            return SVC(random_state=42, probability=True)
+        elif algorithm == 'svm_approx':
+            # RBF kernel approximated with Nystroem features + linear SVM;
+            # probabilities from a 3-fold sigmoid calibration of the linear model
+            return Pipeline([
+                ('nystroem', Nystroem(kernel='rbf', n_components=300, random_state=42)),
+                ('svc', CalibratedClassifierCV(LinearSVC(random_state=42), cv=3, n_jobs=n_jobs)),
+            ])
+        elif algorithm == 'gradient_boosting':
+            return GradientBoostingClassifier(n_estimators=100, random_state=42)
+        elif algorithm == 'sgd':
+            # Logistic loss so predict_proba is available; also trainable with partial_fit
+            return SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+        elif algorithm == 'hist_gradient_boosting':
+            # Histogram-binned boosting; above 10k rows ('auto') holds out 10%
+            # to stop once the validation loss stops improving for 10
+            # iterations. Small sets keep every row: a 10% split of a few
+            # rows cannot hold one sample of each class.
+            return HistGradientBoostingClassifier(
+                max_iter=300,
+                learning_rate=0.1,
+                early_stopping='auto',
+                validation_fraction=0.1,
+                n_iter_no_change=10,
+                random_state=42,
+            )
+        return RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+
+    def _resolve_resources(self, overrides=None):
+        """
+        Per-call resource overrides on top of the predictor's resources
+        """
+        resources = dict(self.resources)
+        if overrides:
+            resources.update({key: value for key, value in overrides.items() if value is not None})
+        return resources
+
+    def _tune(self, X, y, algorithm, cv_folds, min_class_count, cv_n_jobs, budget=None):
+        """
+        HalvingRandomSearchCV over TUNING_SPACES[algorithm]; applies the best
+        parameters to self.pipeline and returns a summary dict.
+
+        The search is sized to the time budget, probe included. Candidate
+        costs vary several-fold across a space (tree counts, max_features),
+        so three sampled candidates are timed on a small sample and the
+        slowest once more on a larger one; its fixed plus n log n cost is
+        used for every fit. halving_seconds() turns that into the cost of a
+        schedule, with the fold fits spread over the CPUs the CV workers can
+        actually use. The most candidates that fit the remaining
+        budget on all rows are searched, otherwise one round on fewer rows;
+        when even that does not fit the search is skipped. The budget is
+        still an estimate, not a hard limit.
+        """
+        space = TUNING_SPACES.get(algorithm)
+        if space is None or not cv_folds or min_class_count < 3:
+            return {'skipped': 'no search space' if space is None else 'too few samples per class'}
+        
+        if budget is None:
+            budget = getattr(settings, 'ML_TUNING_TIME_BUDGET', 60)
+        max_candidates = getattr(settings, 'ML_TUNING_MAX_CANDIDATES', 81)
+        workers = max(1, min(joblib.effective_n_jobs(cv_n_jobs), joblib.cpu_count()))
+        
+        # Probe: time = fixed + per_row * n log n of the slowest sampled candidate
+        # (tree fits sort every feature; linear models are overestimated a little)
+        started = time.perf_counter()
+        order = np.random.default_rng(42).permutation(len(X))
+        small, large = (min(len(X), size) for size in TUNING_PROBE_ROWS)
         
-        # Create labels
-        conditions = [
-            (composite_score >= 90),
-            (composite_score >= 80) & (composite_score < 90),
-            (composite_score >= 70) & (composite_score < 80),
-            (composite_score >= 60) & (composite_score < 70),
-            (composite_score < 60)
-        ]
+        def probe_fit(params, size):
+            start = time.perf_counter()
+            clone(self.pipeline).set_params(**params).fit(X[order[:size]], y[order[:size]])
+            return time.perf_counter() - start
         
-        labels = ['excellent', 'good', 'average', 'poor', 'at_risk']
+        timings = [(probe_fit(params, small), params)
+                   for params in ParameterSampler(space, n_iter=TUNING_PROBE_CANDIDATES, random_state=42)]
+        small_seconds, slowest = max(timings, key=lambda timing: timing[0])
+        def scale(rows):
+            return rows * math.log2(max(rows, 2))
         
-        df['performance_label'] = np.select(conditions, labels, default='average')
+        per_row, fixed = 0.0, small_seconds
+        if large > small:
+            per_row = max(probe_fit(slowest, large) - small_seconds, 0.0) / (scale(large) - scale(small))
+            fixed = max(small_seconds - per_row * scale(small), 0.0)
+        probe_seconds = time.perf_counter() - started
+        # Headroom for scoring the folds and dispatching the fits
+        remaining = (budget - probe_seconds) * TUNING_BUDGET_SHARE
+        
+        def fit_seconds(rows):
+            return fixed + per_row * scale(rows)
+        
+        def estimate(rounds, max_resources):
+            return halving_seconds(rounds, max_resources, min_resources, cv_folds, workers, fit_seconds)
+        
+        # Smallest resources per iteration sklearn accepts for a classifier
+        min_resources = 2 * cv_folds * len(np.unique(y))
+        max_rounds = max(1, int(math.log(max_candidates, TUNING_FACTOR)))
+        rounds, max_resources = None, len(X)
+        for candidate_rounds in range(max_rounds, 0, -1):
+            if (min_resources * TUNING_FACTOR ** candidate_rounds <= len(X)
+                    and estimate(candidate_rounds, len(X)) <= remaining):
+                rounds = candidate_rounds
+                break
+        if rounds is None:
+            # One round on as many rows as the budget allows
+            low, high = min_resources * TUNING_FACTOR, len(X)
+            if low > high or estimate(1, low) > remaining:
+                return {'skipped': 'time budget too small', 'time_budget': budget,
+                        'probe_seconds': round(probe_seconds, 3)}
+            while low < high:
+                middle = (low + high + 1) // 2
+                if estimate(1, middle) <= remaining:
+                    low = middle
+                else:
+                    high = middle - 1
+            rounds, max_resources = 1, low
+        n_candidates = TUNING_FACTOR ** rounds
+        estimated_seconds = probe_seconds + estimate(rounds, max_resources)
+        
+        search = HalvingRandomSearchCV(
+            self.pipeline, space,
+            n_candidates=n_candidates,
+            factor=TUNING_FACTOR,
+            min_resources='exhaust',
+            max_resources=int(max_resources),
+            cv=StratifiedKFold(n_splits=int(cv_folds), shuffle=True, random_state=42),
+            refit=False,
+            # No more processes than CPUs to run them
+            n_jobs=workers,
+            random_state=42,
+            error_score=np.nan,
+        )
+        search.fit(X, y)
+        search_seconds = time.perf_counter() - started
+        
+        best_params = {key: (value.item() if hasattr(value, 'item') else value)
+                       for key, value in search.best_params_.items()}
+        self.pipeline.set_params(**best_params)
+        return {
+            'best_params': {key.removeprefix('model__'): value for key, value in best_params.items()},
+            'best_score': float(search.best_score_),
+            'search_seconds': round(search_seconds, 3),
+            'probe_seconds': round(probe_seconds, 3),
+            'estimated_seconds': round(float(estimated_seconds), 3),
+            'time_budget': budget,
+            'candidates_sampled': int(search.n_candidates_[0]),
+            'candidates_evaluated': int(sum(search.n_candidates_)),
+            'iterations': int(search.n_iterations_),
+            'max_resources': int(max_resources),
+            'resources_per_iteration': [int(n) for n in search.n_resources_],
+        }
+
+    def _evaluate(self, X, y, cv_folds, min_class_count, cv_n_jobs):
+        """
+        One stratified cross-validation run with folds fitted in parallel.
+
+        Out-of-fold predictions come from the fold models themselves (what
+        cross_val_predict would return, without refitting), so held-out
+        metrics cost exactly ``cv_folds`` fits. Returns None when there are
+        too few samples.
+        """
+        # Only perform cross-validation if we have enough samples
+        if not cv_folds or min_class_count < 3:
+            return None
+        try:
+            cv = StratifiedKFold(n_splits=int(cv_folds), shuffle=True, random_state=42)
+            results = cross_validate(
+                self.pipeline, X, y, cv=cv, n_jobs=cv_n_jobs,
+                return_estimator=True, return_indices=True,
+            )
+        except Exception as e:
+            print(f"Cross-validation failed: {e}")
+            return None
+
+        y_pred = np.empty_like(y)
+        folds = []
+        for fold, (estimator, test_index) in enumerate(zip(results['estimator'], results['indices']['test'])):
+            y_pred[test_index] = estimator.predict(X[test_index])
+            folds.append({
+                'fold': fold,
+                'train_rows': int(len(y) - len(test_index)),
+                'test_rows': int(len(test_index)),
+                'fit_seconds': round(float(results['fit_time'][fold]), 4),
+                'score_seconds': round(float(results['score_time'][fold]), 4),
+                'accuracy': float(results['test_score'][fold]),
+                'f1_score': float(f1_score(y[test_index], y_pred[test_index], average='weighted', zero_division=0)),
+            })
+        return {'method': 'stratified_cv', 'cv_folds': int(cv_folds), 'folds': folds, 'y_pred': y_pred}
+
+    def create_synthetic_labels(self, df):
+        """
+        Create synthetic performance labels based on rules
+        """
+        df['performance_label'] = rule_labels(to_feature_matrix(df))
         
         return df
     
-    def predict_batch(self, df):
+    @timed_section('predict_batch')
+    def predict_batch(self, df, student_ids=None):
         """
         Predict performance for batch of students
+
+        ``df`` is a DataFrame or a schema-ordered feature matrix (then pass ``student_ids``)
         """
         predictions = []
+        is_frame = isinstance(df, pd.DataFrame)
+        if student_ids is None:
+            student_ids = (df['student_id'].tolist() if is_frame and 'student_id' in df.columns
+                           else [f'Student_{idx}' for idx in range(len(df))])
         
         try:
             # Prepare features
-            X = self.prepare_features(df)
+            with span('features'):
+                X = to_feature_matrix(df)
             
             if len(X) == 0:
                 return [{'student_id': '', 'prediction': 'Error: No features', 'is_at_risk': False}]
             
-            # Scale features
-            X_scaled = self.scaler.transform(X)
-            
             # Make predictions
-            if self.model is None:
+            confidences = None
+            if self.pipeline is None:
                 # If no model is trained, use rule-based prediction
-                predicted_labels = []
-                for idx in range(len(df)):
-                    prediction = self.rule_based_prediction(df.iloc[idx])
-                    predicted_labels.append(prediction)
+                predicted_labels = rule_labels(X)
+                confidences = [0.70] * len(predicted_labels)
             else:
-                # Use trained model
+                # Use trained model: one predict_proba call for the whole batch
                 try:
-                    predicted_labels = self.model.predict(X_scaled)
-                except:
+                    if hasattr(self.pipeline, 'predict_proba'):
+                        proba = self.predict_proba(X)
+                        predicted_labels = self.pipeline.classes_[proba.argmax(axis=1)]
+                        confidences = proba.max(axis=1).tolist()
+                    else:
+                        predicted_labels = self.pipeline.predict(X)
+                except Exception:
                     # Fallback to rule-based
-                    predicted_labels = []
-                    for idx in range(len(df)):
-                        prediction = self.rule_based_prediction(df.iloc[idx])
-                        predicted_labels.append(prediction)
+                    predicted_labels = rule_labels(X)
+                    confidences = [0.70] * len(predicted_labels)
+            
+            if confidences is None:
+                confidences = [0.85] * len(predicted_labels)
             
             # Format predictions
-            for idx, label in enumerate(predicted_labels):
-                student_id = df.iloc[idx]['student_id'] if 'student_id' in df.columns else f'Student_{idx}'
-                
-                # Get prediction probability if available
-                confidence = 0.85
-                if self.model is not None and hasattr(self.model, 'predict_proba'):
-                    try:
-                        proba = self.model.predict_proba(X_scaled[idx:idx+1])
-                        confidence = float(np.max(proba))
-                    except:
-                        pass
-                
-                prediction = {
-                    'student_id': student_id,
-                    'prediction': label.title() if isinstance(label, str) else label,
-                    'is_at_risk': label in ['at_risk', 'poor'] if isinstance(label, str) else False,
-                    'confidence': confidence
-                }
-                predictions.append(prediction)
+            with span('format'):
+                for student_id, label, confidence in zip(student_ids, predicted_labels, confidences):
+                    prediction = {
+                        'student_id': student_id,
+                        'prediction': label.title() if isinstance(label, str) else label,
+                        'is_at_risk': label in ['at_risk', 'poor'] if isinstance(label, str) else False,
+                        'confidence': float(confidence)
+                    }
+                    predictions.append(prediction)
                 
         except Exception as e:
             print(f"Error in batch prediction: {str(e)}")
             # Fall back to rule-based prediction
             for idx in range(len(df)):
                 try:
-                    prediction = self.rule_based_prediction(df.iloc[idx])
-                    student_id = df.iloc[idx]['student_id'] if 'student_id' in df.columns else f'Student_{idx}'
+                    row = df.iloc[idx] if is_frame else dict(zip(FEATURE_COLUMNS, df[idx]))
+                    prediction = self.rule_based_prediction(row)
                     
                     predictions.append({
-                        'student_id': student_id,
+                        'student_id': student_ids[idx],
                         'prediction': prediction.title(),
                         'is_at_risk': prediction in ['at_risk', 'poor'],
                         'confidence': 0.70
@@ -257,37 +929,12 @@ class StudentPerformancePredictor:
     
     def rule_based_prediction(self, student_data):
         """
-        Rule-based prediction as fallback
+        Rule-based prediction as fallback (single student; see rule_labels for batches)
         """
         try:
-            # Extract values with defaults
-            attendance = float(student_data.get('attendance', 75) if pd.notna(student_data.get('attendance', 75)) else 75)
-            assignment_score = float(student_data.get('assignment_score', 75) if pd.notna(student_data.get('assignment_score', 75)) else 75)
-            quiz_score = float(student_data.get('quiz_score', 75) if pd.notna(student_data.get('quiz_score', 75)) else 75)
-            time_spent = float(student_data.get('time_spent', 30) if pd.notna(student_data.get('time_spent', 30)) else 30)
-            forum_posts = float(student_data.get('forum_posts', 10) if pd.notna(student_data.get('forum_posts', 10)) else 10)
-            resources_viewed = float(student_data.get('resources_viewed', 10) if pd.notna(student_data.get('resources_viewed', 10)) else 10)
-            
-            # Calculate weighted score
-            weighted_score = (
-                attendance * 0.2 +
-                assignment_score * 0.3 +
-                quiz_score * 0.3 +
-                min(time_spent / 60 * 100, 100) * 0.1 +
-                min(forum_posts / 20 * 100, 100) * 0.05 +
-                min(resources_viewed / 50 * 100, 100) * 0.05
-            )
-            
-            if weighted_score >= 85:
-                return 'excellent'
-            elif weighted_score >= 70:
-                return 'good'
-            elif weighted_score >= 50:
-                return 'average'
-            elif weighted_score >= 35:
-                return 'poor'
-            else:
-                return 'at_risk'
+            row = [student_data.get(col, default) for col, default in FEATURE_SCHEMA]
+            row = [value if pd.notna(value) else np.nan for value in row]
+            return str(rule_labels(np.array([row], dtype=np.float32))[0])
         except Exception as e:
             print(f"Error in rule-based prediction: {e}")
             return 'average'
@@ -296,12 +943,10 @@ class StudentPerformancePredictor:
         """
         Get feature importance from model
         """
-        if hasattr(self, 'feature_importance') and self.feature_importance:
+        if self.feature_importance:
             importance = self.feature_importance
-        elif hasattr(self.model, 'feature_importances_'):
-            importance = dict(zip(self.feature_names, self.model.feature_importances_))
-        elif hasattr(self.model, 'coef_'):
-            importance = dict(zip(self.feature_names, np.abs(self.model.coef_).mean(axis=0)))
+        elif self.model is not None:
+            importance = self._estimator_importance()
         else:
             # Default importance
             importance = {feature: 1/len(self.feature_names) for feature in self.feature_names}
@@ -311,7 +956,7 @@ class StudentPerformancePredictor:
     
     def save_model(self, filename):
         """
-        Save trained model to file
+        Save trained model to file (compressed, with a manifest)
         """
         # Create models directory if it doesn't exist
         models_dir = os.path.join(settings.MEDIA_ROOT, 'models')
@@ -319,15 +964,22 @@ class StudentPerformancePredictor:
         
         model_path = os.path.join(models_dir, filename)
         
-        # Save model and preprocessing objects
+        manifest = dict(
+            self.manifest,
+            schema_version=ARTEFACT_SCHEMA_VERSION,
+            features=list(self.feature_names),
+            sklearn_version=sklearn.__version__,
+            created_at=datetime.now().isoformat(timespec='seconds'),
+        )
+        
+        # Save the fitted pipeline (imputer + scaler + estimator)
         joblib.dump({
-            'model': self.model,
-            'scaler': self.scaler,
-            'label_encoder': self.label_encoder,
-            'feature_names': self.feature_names,
-            'feature_importance': self.feature_importance if hasattr(self, 'feature_importance') else {}
-        }, model_path)
+            'manifest': manifest,
+            'pipeline': compact_pipeline(self.pipeline),
+            'feature_importance': self.feature_importance,
+        }, model_path, compress=artefact_compression())
         
+        self.manifest = manifest
         return model_path
     
     def load_model(self, filepath):
@@ -337,14 +989,35 @@ class StudentPerformancePredictor:
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Model file not found: {filepath}")
         
-        saved_data = joblib.load(filepath)
+        saved_data, manifest, self.load_seconds = read_artefact(filepath)
         
-        self.model = saved_data['model']
-        self.scaler = saved_data['scaler']
-        self.label_encoder = saved_data['label_encoder']
-        self.feature_names = saved_data['feature_names']
+        if manifest['schema_version'] > ARTEFACT_SCHEMA_VERSION:
+            raise ValueError(
+                f"Model artefact schema v{manifest['schema_version']} is newer than "
+                f"supported v{ARTEFACT_SCHEMA_VERSION}: {filepath}"
+            )
+        if manifest.get('features', FEATURE_COLUMNS) != FEATURE_COLUMNS:
+            raise ValueError(f"Model artefact features {manifest['features']} do not match {FEATURE_COLUMNS}")
         
-        if 'feature_importance' in saved_data:
-            self.feature_importance = saved_data['feature_importance']
+        if 'pipeline' in saved_data:
+            self.pipeline = saved_data['pipeline']
+        else:
+            # Legacy artefact: separate scaler + model. The scaler's mean is the
+            # training mean, which is what the old code imputed with.
+            scaler = saved_data['scaler']
+            imputer = SimpleImputer(strategy='mean').fit(scaler.mean_.reshape(1, -1))
+            self.pipeline = Pipeline([
+                ('imputer', imputer),
+                ('scaler', scaler),
+                ('model', saved_data['model']),
+            ])
+        self.manifest = manifest
+        self.feature_names = manifest.get('features') or saved_data.get('feature_names') or list(FEATURE_COLUMNS)
+        self.feature_importance = saved_data.get('feature_importance', {})
+        
+        if getattr(settings, 'ML_FAST_TREE_INFERENCE', True):
+            self.compile_trees()
+        else:
+            self.compiled = None
         
-        return True
\ No newline at end of file
+        return True
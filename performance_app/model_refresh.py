@@ -0,0 +1,114 @@
+# performance_app/model_refresh.py
+"""
+Registration and warm-start refresh of PredictionModels.
+
+register_model() saves a trained predictor's artefact and records it as a
+PredictionModel; every training path (the train view, snapshot_students
+--train and refreshes) goes through it.
+
+Instead of retraining from scratch, the active model is loaded and updated
+with only the students added since it was trained (see
+StudentPerformancePredictor.refresh_model). Each refresh is saved as a new
+PredictionModel whose ``parent`` points at the model it started from and
+replaces it as the active model.
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .features import FEATURE_COLUMNS
+from .models import PredictionModel, Student
+
+
+def active_model():
+    """
+    The PredictionModel online scoring uses (newest active one with an artefact)
+    """
+    return (PredictionModel.objects.filter(is_active=True, model_file__gt='')
+            .order_by('-created_at').first())
+
+
+def register_model(predictor, metrics, features, name, user=None, activate=True, **fields):
+    """
+    Save ``predictor``'s artefact and create its PredictionModel. With
+    ``activate`` the new model replaces the active one(s) in one transaction.
+    Extra ``fields`` (parent, training_watermark, ...) are stored as given.
+    """
+    stamp = datetime.now()
+    prefix = 'refreshed_model' if fields.get('parent') else 'trained_model'
+    model_path = predictor.save_model(f"{prefix}_{stamp.strftime('%Y%m%d_%H%M%S')}.joblib")
+    fields.setdefault('training_rows', predictor.manifest['training_rows'])
+    with transaction.atomic():
+        if activate:
+            PredictionModel.objects.filter(is_active=True).update(is_active=False)
+        return PredictionModel.objects.create(
+            name=f"{name} {stamp.strftime('%Y-%m-%d %H:%M')}",
+            # Concrete algorithm ('auto' and large-data 'svm' are resolved at training)
+            algorithm=predictor.manifest['algorithm'],
+            accuracy=metrics['accuracy'],
+            precision=metrics['precision'],
+            recall=metrics['recall'],
+            evaluation=predictor.evaluation,
+            tuning=predictor.tuning,
+            model_file=os.path.relpath(model_path, settings.MEDIA_ROOT),
+            features=json.dumps(features),
+            is_active=activate,
+            trained_by=user,
+            **fields,
+        )
+
+
+def rows_since(watermark, chunk_size=10000):
+    """
+    (X, labels or None, new watermark) for students created after ``watermark``
+
+    Selection is by created_at: updated_at also moves when predictions are
+    written back, which would feed rows the model has already seen into it
+    again.
+    """
+    queryset = Student.objects.order_by()
+    if watermark is not None:
+        queryset = queryset.filter(created_at__gt=watermark)
+    rows = list(queryset.values_list(*FEATURE_COLUMNS, 'actual_performance', 'created_at')
+                .iterator(chunk_size=chunk_size))
+    if not rows:
+        return np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32), None, watermark
+
+    n_features = len(FEATURE_COLUMNS)
+    X = np.array([row[:n_features] for row in rows], dtype=np.float32)
+    actual = [row[n_features] for row in rows]
+    # Recorded outcomes only when every row has one, otherwise rule labels
+    labels = np.array(actual) if all(actual) else None
+    return X, labels, max(row[n_features + 1] for row in rows)
+
+
+def refresh_active_model(user=None, extra_estimators=None):
+    """
+    Refresh the active model with students created after its training watermark.
+
+    Returns (new PredictionModel, metrics), or (None, None) when there are no
+    new rows. Raises ValueError when there is no active model or it cannot be
+    refreshed incrementally.
+    """
+    parent = active_model()
+    if parent is None:
+        raise ValueError("No active model to refresh")
+
+    X, labels, watermark = rows_since(parent.training_watermark or parent.created_at)
+    if not len(X):
+        return None, None
+
+    from .ml_model import StudentPerformancePredictor
+
+    predictor = StudentPerformancePredictor()
+    predictor.load_model(parent.model_file.path)
+    metrics, features = predictor.refresh_model(X, labels=labels, extra_estimators=extra_estimators)
+
+    # Deactivates the parent in the same transaction that activates the refresh
+    record = register_model(predictor, metrics, features, 'Refreshed Model', user=user,
+                            parent=parent, training_watermark=watermark)
+    return record, metrics
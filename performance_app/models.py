@@ -78,10 +78,20 @@ class Student(models.Model):
     )
 
     is_at_risk = models.BooleanField(default=False)
+    # Confidence of predicted_performance and the model version that produced it
+    prediction_confidence = models.FloatField(null=True, blank=True)
+    prediction_model = models.CharField(max_length=64, blank=True)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True) 
 
+    class Meta:
+        indexes = [
+            # Feature-store versions (MAX(updated_at) per course) and snapshot refreshes
+            models.Index(fields=['course', 'updated_at'], name='student_course_updated_idx'),
+            models.Index(fields=['updated_at'], name='student_updated_idx'),
+        ]
+
     def __str__(self):
         return self.student_id
 
@@ -102,6 +112,17 @@ class PredictionModel(models.Model):
     accuracy = models.FloatField(null=True, blank=True)
     precision = models.FloatField(null=True, blank=True)
     recall = models.FloatField(null=True, blank=True)
+    # Held-out evaluation: method, per-fold timings and metrics (see StudentPerformancePredictor._evaluate)
+    evaluation = models.JSONField(default=dict, blank=True)
+    # Hyperparameter search: best params, search time, candidates evaluated (StudentPerformancePredictor._tune)
+    tuning = models.JSONField(default=dict, blank=True)
+    # Lineage: the model this one was warm-start refreshed from, the latest
+    # Student.created_at it has seen, and rows used across the whole lineage
+    parent = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='refreshes'
+    )
+    training_watermark = models.DateTimeField(null=True, blank=True)
+    training_rows = models.IntegerField(default=0)
     model_file = models.FileField(upload_to='models/', null=True, blank=True)
     features = models.JSONField(default=list)
     trained_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
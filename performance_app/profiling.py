@@ -0,0 +1,250 @@
+# performance_app/profiling.py
+"""
+On-demand profiling of the ML and charting hot paths.
+
+Code marks its steps with span() / profiled(); outside a profiling session
+these are no-ops. profile_session() collects the spans into a tree (repeated
+steps such as per-row work in the CSV import are merged and counted) and can
+also run cProfile or, when installed, pyinstrument. Results are written to
+MEDIA_ROOT/profiles/.
+
+With PROFILING_ENABLED set, admins can profile any page by adding
+``?profile`` (spans only), ``?profile=cprofile`` or ``?profile=pyinstrument``
+to its URL; the response names the written files in an X-Profile header.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+PROFILE_MODES = ('spans', 'cprofile', 'pyinstrument')
+PROFILE_QUERY_PARAM = 'profile'
+
+_active = ContextVar('performance_profile', default=None)
+
+
+def pyinstrument_available():
+    return pyinstrument is not None
+
+
+def profiles_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'profiles')
+
+
+class Span:
+    """
+    One named step; children with the same name are merged
+    """
+
+    __slots__ = ('name', 'seconds', 'calls', 'children')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.children = {}
+
+    def child(self, name):
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = Span(name)
+        return node
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'seconds': round(self.seconds, 6),
+            'calls': self.calls,
+            'children': [child.as_dict() for child in self.children.values()],
+        }
+
+    def format(self, depth=0):
+        """
+        Indented text tree: total ms, calls, name
+        """
+        lines = [f"{self.seconds * 1000:10.1f}ms {self.calls:6}x  {'  ' * depth}{self.name}"]
+        for child in self.children.values():
+            lines.extend(child.format(depth + 1))
+        return lines
+
+
+class Profile:
+    """
+    Span tree of one profiling session
+    """
+
+    def __init__(self, name, mode='spans'):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; use one of {PROFILE_MODES}")
+        if mode == 'pyinstrument' and not pyinstrument_available():
+            raise ValueError("pyinstrument is not installed")
+        self.name = name
+        self.mode = mode
+        self.root = Span(name)
+        self.stack = [self.root]
+        self.files = []
+
+
+@contextmanager
+def span(name):
+    """
+    Time a step as a child of the innermost open span of the active session
+    """
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    node = profile.stack[-1].child(name)
+    profile.stack.append(node)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        node.seconds += time.perf_counter() - start
+        node.calls += 1
+        profile.stack.pop()
+
+
+def profiled(name):
+    """
+    Decorator form of span()
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _slug(name):
+    return ''.join(c if c.isalnum() else '-' for c in name).strip('-')[:60] or 'profile'
+
+
+def _write(profile, profiler):
+    """
+    Write the span tree (and the profiler's report) to MEDIA_ROOT/profiles/
+    """
+    os.makedirs(profiles_dir(), exist_ok=True)
+    base = os.path.join(profiles_dir(), f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{_slug(profile.name)}")
+
+    with open(f'{base}.json', 'w') as f:
+        json.dump({'name': profile.name, 'mode': profile.mode, 'spans': profile.root.as_dict()}, f, indent=1)
+    profile.files.append(f'{base}.json')
+
+    if profile.mode == 'cprofile':
+        profiler.dump_stats(f'{base}.prof')
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(60)
+        with open(f'{base}.txt', 'w') as f:
+            f.write('\n'.join(profile.root.format()) + '\n\n' + text.getvalue())
+        profile.files.extend([f'{base}.prof', f'{base}.txt'])
+    elif profile.mode == 'pyinstrument':
+        with open(f'{base}.html', 'w') as f:
+            f.write(profiler.output_html())
+        profile.files.append(f'{base}.html')
+
+
+@contextmanager
+def profile_session(name, mode='spans'):
+    """
+    Collect spans (and optionally cProfile / pyinstrument samples) for the
+    enclosed block and write them to MEDIA_ROOT/profiles/; yields the Profile
+    """
+    profile = Profile(name, mode)
+    profiler = None
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+    elif mode == 'pyinstrument':
+        profiler = pyinstrument.Profiler(async_mode='enabled')
+
+    token = _active.set(profile)
+    start = time.perf_counter()
+    if mode == 'cprofile':
+        profiler.enable()
+    elif mode == 'pyinstrument':
+        profiler.start()
+    try:
+        yield profile
+    finally:
+        if mode == 'cprofile':
+            profiler.disable()
+        elif mode == 'pyinstrument':
+            profiler.stop()
+        profile.root.seconds = time.perf_counter() - start
+        profile.root.calls = 1
+        _active.reset(token)
+        try:
+            _write(profile, profiler)
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+
+
+def _requested_mode(request):
+    if not getattr(settings, 'PROFILING_ENABLED', False) or PROFILE_QUERY_PARAM not in request.GET:
+        return None
+    mode = request.GET[PROFILE_QUERY_PARAM] or 'spans'
+    if mode == '1':
+        return 'spans'
+    if mode == 'pyinstrument' and not pyinstrument_available():
+        return 'cprofile'
+    return mode
+
+
+def _is_admin(user):
+    from .models import UserProfile
+
+    if not user.is_authenticated:
+        return False
+    return user.is_superuser or UserProfile.objects.filter(user=user, role='admin').exists()
+
+
+class ProfilingMiddleware:
+    """
+    Runs admin requests carrying ?profile[=mode] inside a profile_session()
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _annotate(self, response, profile):
+        response['X-Profile'] = ', '.join(os.path.basename(path) for path in profile.files)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = _requested_mode(request)
+        if mode not in PROFILE_MODES or not _is_admin(request.user):
+            return self.get_response(request)
+        with profile_session(f'{request.method} {request.path}', mode) as profile:
+            response = self.get_response(request)
+        return self._annotate(response, profile)
+
+    async def __acall__(self, request):
+        mode = _requested_mode(request)
+        if mode not in PROFILE_MODES or not await sync_to_async(_is_admin)(await request.auser()):
+            return await self.get_response(request)
+        with profile_session(f'{request.method} {request.path}', mode) as profile:
+            response = await self.get_response(request)
+        return self._annotate(response, profile)
@@ -0,0 +1,289 @@
+# performance_app/snapshot.py
+"""
+Columnar, memory-mapped snapshot of the Student feature table.
+
+Each column is a raw .npy file under MEDIA_ROOT/snapshots/students/ that is
+opened with np.load(mmap_mode='r'), so training jobs (snapshot_students
+--train) and ad-hoc analytics can scan millions of rows without creating ORM
+objects or holding the table in RAM. Online scoring and the chart views read
+the live tables through the feature store instead.
+
+refresh_snapshot() is incremental: rows whose updated_at is newer than the
+stored watermark are patched in place or appended, and deleted students are
+masked out through the ``live`` column. Columns that have to be rebuilt or
+enlarged are written to new ``.staged`` files and moved over the old ones
+with os.replace() at the end of the refresh, so a crash or a reader that has
+the old files memory-mapped never sees a truncated column.
+"""
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .feature_store import CourseFeatures
+from .features import FEATURE_COLUMNS
+from .models import Student
+
+# Label columns are stored as int8 codes into this vocabulary
+LABELS = [''] + [value for value, _ in Student.PERFORMANCE_CHOICES]
+_LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+
+# column -> (dtype, trailing shape)
+COLUMNS = {
+    'ids': (np.int64, ()),
+    'X': (np.float32, (len(FEATURE_COLUMNS),)),
+    'course': (np.int64, ()),         # -1 = no course
+    'predicted': (np.int8, ()),
+    'actual': (np.int8, ()),
+    'at_risk': (np.bool_, ()),
+    'live': (np.bool_, ()),
+}
+SNAPSHOT_FIELDS = ('id', *FEATURE_COLUMNS, 'course_id', 'predicted_performance',
+                   'actual_performance', 'is_at_risk', 'updated_at')
+
+StudentSnapshot = namedtuple('StudentSnapshot', [*COLUMNS, 'rows', 'watermark'])
+
+
+def snapshot_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'snapshots', 'students')
+
+
+def _meta_path():
+    return os.path.join(snapshot_dir(), 'meta.json')
+
+
+def _read_meta():
+    try:
+        with open(_meta_path()) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_meta(meta):
+    tmp_path = _meta_path() + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _meta_path())
+
+
+def _column_path(name):
+    return os.path.join(snapshot_dir(), f'{name}.npy')
+
+
+def _staged_path(name):
+    return f'{_column_path(name)}.staged'
+
+
+def _open_columns(capacity, mode):
+    """
+    Memory-mapped columns: the live files, or new empty ``.staged`` files for mode 'w+'
+    """
+    columns = {}
+    for name, (dtype, shape) in COLUMNS.items():
+        if mode == 'w+':
+            columns[name] = np.lib.format.open_memmap(_staged_path(name), mode='w+', dtype=dtype,
+                                                      shape=(capacity, *shape))
+        else:
+            columns[name] = np.load(_column_path(name), mmap_mode=mode)
+    return columns
+
+
+def _grow(columns, rows, capacity):
+    """
+    Copy the first ``rows`` rows of every column into new staged files with a
+    larger capacity; the files being copied are never truncated
+    """
+    grown = {}
+    for name, (dtype, shape) in COLUMNS.items():
+        tmp_path = f'{_staged_path(name)}.tmp'
+        column = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(capacity, *shape))
+        column[:rows] = columns[name][:rows]
+        column.flush()
+        columns[name].flush()
+        # The open memmap follows the file to its new name
+        os.replace(tmp_path, _staged_path(name))
+        grown[name] = column
+    columns.clear()
+    return grown
+
+
+def _publish_staged():
+    """
+    Move staged column files over the live ones
+    """
+    for name in COLUMNS:
+        if os.path.exists(_staged_path(name)):
+            os.replace(_staged_path(name), _column_path(name))
+
+
+def _encode_chunk(chunk):
+    """
+    values_list() rows -> dict of column arrays
+    """
+    fields = list(zip(*chunk))
+    n_features = len(FEATURE_COLUMNS)
+    X = np.empty((len(chunk), n_features), dtype=np.float32)
+    for i in range(n_features):
+        X[:, i] = np.array(fields[1 + i], dtype=np.float32)
+    offset = 1 + n_features
+    return {
+        'ids': np.array(fields[0], dtype=np.int64),
+        'X': X,
+        'course': np.array([c if c is not None else -1 for c in fields[offset]], dtype=np.int64),
+        'predicted': np.array([_LABEL_CODES.get(v, 0) for v in fields[offset + 1]], dtype=np.int8),
+        'actual': np.array([_LABEL_CODES.get(v, 0) for v in fields[offset + 2]], dtype=np.int8),
+        'at_risk': np.array(fields[offset + 3], dtype=np.bool_),
+        'live': np.ones(len(chunk), dtype=np.bool_),
+    }, max(fields[offset + 4])
+
+
+def refresh_snapshot(rebuild=False, chunk_size=50000):
+    """
+    Bring the snapshot up to date with the Student table; returns a stats dict
+    """
+    os.makedirs(snapshot_dir(), exist_ok=True)
+    meta = None if rebuild else _read_meta()
+    # Left over from an interrupted refresh
+    for name in COLUMNS:
+        for path in (_staged_path(name), f'{_staged_path(name)}.tmp'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    if meta is None:
+        capacity = max(chunk_size, Student.objects.count())
+        columns = _open_columns(capacity, 'w+')
+        rows, watermark = 0, None
+    else:
+        capacity, rows = meta['capacity'], meta['rows']
+        watermark = parse_datetime(meta['watermark']) if meta['watermark'] else None
+        columns = _open_columns(capacity, 'r+')
+
+    queryset = Student.objects.order_by('id')
+    if watermark is not None:
+        queryset = queryset.filter(updated_at__gt=watermark)
+
+    appended = patched = 0
+    chunk = []
+    new_watermark = watermark
+
+    def apply(chunk):
+        nonlocal columns, rows, capacity, appended, patched, new_watermark
+        data, chunk_watermark = _encode_chunk(chunk)
+        new_watermark = max(new_watermark, chunk_watermark) if new_watermark else chunk_watermark
+
+        existing = np.zeros(len(data['ids']), dtype=bool)
+        if rows:
+            known_ids = columns['ids'][:rows]
+            positions = np.minimum(np.searchsorted(known_ids, data['ids']), rows - 1)
+            existing = known_ids[positions] == data['ids']
+            if existing.any():
+                for name in COLUMNS:
+                    columns[name][positions[existing]] = data[name][existing]
+                patched += int(existing.sum())
+
+        new = ~existing
+        n_new = int(new.sum())
+        if n_new:
+            # Appends must keep ids sorted for searchsorted lookups
+            if rows and data['ids'][new].min() < columns['ids'][rows - 1]:
+                raise ValueError('Out-of-order student ids; rebuild the snapshot')
+            if rows + n_new > capacity:
+                capacity = max(capacity * 2, rows + n_new)
+                columns = _grow(columns, rows, capacity)
+            for name in COLUMNS:
+                columns[name][rows:rows + n_new] = data[name][new]
+            rows += n_new
+            appended += n_new
+
+    for row in queryset.values_list(*SNAPSHOT_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            apply(chunk)
+            chunk = []
+    if chunk:
+        apply(chunk)
+
+    # Deletions do not touch updated_at: mask out ids that no longer exist
+    deleted = 0
+    live_count = int(np.count_nonzero(columns['live'][:rows]))
+    if live_count != Student.objects.count():
+        present = np.fromiter(Student.objects.values_list('id', flat=True).iterator(chunk_size=chunk_size),
+                              dtype=np.int64)
+        still_live = np.isin(columns['ids'][:rows], present)
+        deleted = int(np.count_nonzero(columns['live'][:rows] & ~still_live))
+        columns['live'][:rows] = still_live
+
+    for column in columns.values():
+        column.flush()
+    _publish_staged()
+    _write_meta({
+        'rows': rows,
+        'capacity': capacity,
+        'watermark': new_watermark.isoformat() if new_watermark else None,
+        'refreshed_at': timezone.now().isoformat(),
+    })
+    return {'rows': rows, 'appended': appended, 'patched': patched, 'deleted': deleted}
+
+
+def load_snapshot():
+    """
+    Memory-mapped StudentSnapshot (read-only), or None if no snapshot exists
+    """
+    meta = _read_meta()
+    if meta is None:
+        return None
+    rows = meta['rows']
+    columns = _open_columns(meta['capacity'], 'r')
+    return StudentSnapshot(
+        **{name: column[:rows] for name, column in columns.items()},
+        rows=rows,
+        watermark=meta['watermark'],
+    )
+
+
+def snapshot_features(snapshot, course_ids=None):
+    """
+    CourseFeatures view of the live rows (optionally restricted to some courses),
+    usable by the predictor and generate_charts
+    """
+    mask = np.asarray(snapshot.live)
+    if course_ids is not None:
+        wanted = [-1 if course_id is None else course_id for course_id in course_ids]
+        mask = mask & np.isin(snapshot.course, wanted)
+    labels = np.array(LABELS, dtype=object)
+    return CourseFeatures(
+        ids=snapshot.ids[mask],
+        student_ids=None,
+        X=snapshot.X[mask],
+        predicted=labels[snapshot.predicted[mask]],
+        at_risk=snapshot.at_risk[mask],
+        version=snapshot.watermark,
+    )
+
+
+def iter_snapshot_chunks(snapshot, chunk_size=100000):
+    """
+    (ids, X, actual_labels) for live rows, chunk by chunk straight from the memmap
+    """
+    labels = np.array(LABELS, dtype=object)
+    for start in range(0, snapshot.rows, chunk_size):
+        stop = min(start + chunk_size, snapshot.rows)
+        live = np.asarray(snapshot.live[start:stop])
+        yield (snapshot.ids[start:stop][live], np.asarray(snapshot.X[start:stop][live]),
+               labels[snapshot.actual[start:stop][live]])
+
+
+def training_chunks(snapshot, chunk_size=100000):
+    """
+    Chunk source for StudentPerformancePredictor.train_streaming: recorded
+    outcomes where every row in the chunk has one, otherwise rule labels
+    """
+    def chunks():
+        for _, X, labels in iter_snapshot_chunks(snapshot, chunk_size):
+            yield X, (labels if len(labels) and all(labels) else None)
+    return chunks
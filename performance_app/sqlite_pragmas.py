@@ -0,0 +1,40 @@
+# performance_app/sqlite_pragmas.py
+"""
+SQLite concurrency settings for every new database connection.
+
+Concurrent CSV uploads and dashboard reads on db.sqlite3 used to fail with
+"database is locked". apply_sqlite_pragmas() runs settings.SQLITE_PRAGMAS on
+each SQLite connection Django opens: the page cache and mmap size keep hot
+pages out of the read() path, and WAL journaling (only when
+SQLITE_JOURNAL_MODE is set, as it changes the database file) lets readers
+continue while a write transaction is open. How long a connection waits for
+another writer's lock is the DATABASES OPTIONS 'timeout' (SQLITE_TIMEOUT).
+Other database backends are left untouched.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def sqlite_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', {})
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Straight on the DB-API connection: not logged or counted as app queries
+    for name, value in sqlite_pragmas().items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def pragma_values(connection, names=None):
+    """
+    {pragma: current value} of an open SQLite connection
+    """
+    connection.ensure_connection()
+    return {
+        name: connection.connection.execute(f'PRAGMA {name}').fetchone()[0]
+        for name in (names or sqlite_pragmas())
+    }
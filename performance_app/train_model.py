@@ -35,14 +35,24 @@ if not settings.configured:
 django.setup()
 
 # Now import Django models
-from performance_app.ml_model import StudentPerformancePredictor
+from performance_app.ml_model import (
+    StudentPerformancePredictor, LARGE_DATASET_ROWS, FEATURE_COLUMNS, csv_chunks, rule_labels, to_feature_matrix
+)
 from performance_app.models import Course, Student, PredictionModel
 from django.contrib.auth.models import User
 from datetime import datetime
 
-def load_and_train_csv(csv_file_path=None, course_id=None):
+def load_and_train_csv(csv_file_path=None, course_id=None, resources=None, algorithms=None, chunk_size=None,
+                       tune=False, tune_budget=None):
     """
     Load CSV data and train the model
+
+    ``resources`` overrides settings.ML_TRAINING_RESOURCES (n_jobs, cv_n_jobs, blas_threads)
+    ``algorithms`` is the list of algorithms to compare; by default large
+    datasets only try the histogram-based booster
+    ``chunk_size`` switches to out-of-core training (see train_csv_streaming)
+    ``tune`` runs a successive-halving hyperparameter search per algorithm
+    (``tune_budget`` seconds each, default settings.ML_TUNING_TIME_BUDGET)
     """
     if csv_file_path is None:
         # Try to find CSV in dataset folder
@@ -56,6 +66,9 @@ def load_and_train_csv(csv_file_path=None, course_id=None):
         print("Please provide the full path to your CSV file.")
         return None, None, None
     
+    if chunk_size:
+        return train_csv_streaming(csv_file_path, chunk_size, resources)
+    
     print(f"Loading CSV file: {csv_file_path}")
     
     # Load CSV
@@ -92,37 +105,12 @@ def load_and_train_csv(csv_file_path=None, course_id=None):
     print(df.describe())
     
     # Prepare features for training
-    features = ['attendance', 'assignment_score', 'quiz_score', 
-                'time_spent', 'forum_posts', 'resources_viewed']
-    
     # Create training data
-    X = df[features].copy()
+    X = df[FEATURE_COLUMNS].copy()
     
     # For demonstration, let's create labels based on rules
-    # Define performance categories based on weighted scores
-    weights = {
-        'attendance': 0.2,
-        'assignment_score': 0.3,
-        'quiz_score': 0.3,
-        'time_spent': 0.1,
-        'forum_posts': 0.05,
-        'resources_viewed': 0.05
-    }
-    
-    # Calculate weighted score
-    weighted_scores = (
-        X['attendance'] * weights['attendance'] +
-        X['assignment_score'] * weights['assignment_score'] +
-        X['quiz_score'] * weights['quiz_score'] +
-        (X['time_spent'] / 60 * 100) * weights['time_spent'] +
-        (X['forum_posts'] / 20 * 100) * weights['forum_posts'] +
-        (X['resources_viewed'] / 50 * 100) * weights['resources_viewed']
-    )
-    
-    # Create labels based on weighted scores
-    y = pd.cut(weighted_scores, 
-               bins=[0, 60, 70, 80, 90, 100],
-               labels=['at_risk', 'poor', 'average', 'good', 'excellent'])
+    # (same weights/thresholds as the predictor's rule-based fallback)
+    y = pd.Series(rule_labels(to_feature_matrix(X)), index=X.index)
     
     # Add labels to DataFrame
     df['performance_label'] = y
@@ -131,20 +119,27 @@ def load_and_train_csv(csv_file_path=None, course_id=None):
     print(y.value_counts().sort_index())
     
     # Initialize and train predictor
-    predictor = StudentPerformancePredictor()
+    predictor = StudentPerformancePredictor(resources=resources)
     
     # Add labels to training data
     training_df = X.copy()
     training_df['performance_label'] = y
     
     # Try different algorithms
-    algorithms = ['random_forest', 'gradient_boosting', 'decision_tree']
+    if algorithms is None:
+        if len(training_df) >= LARGE_DATASET_ROWS:
+            algorithms = ['hist_gradient_boosting']
+        else:
+            algorithms = ['random_forest', 'hist_gradient_boosting', 'gradient_boosting', 'decision_tree']
     best_accuracy = 0
     best_model = None
     
     for algorithm in algorithms:
         print(f"\nTraining with {algorithm}...")
-        metrics, feature_names = predictor.train_model(training_df, algorithm)
+        metrics, feature_names = predictor.train_model(training_df, algorithm, tune=tune, tune_budget=tune_budget)
+        if predictor.tuning.get('best_params'):
+            print(f"Tuned {predictor.tuning['candidates_evaluated']} candidates in "
+                  f"{predictor.tuning['search_seconds']:.1f}s: {predictor.tuning['best_params']}")
         
         if metrics['accuracy'] > best_accuracy:
             best_accuracy = metrics['accuracy']
@@ -177,6 +172,34 @@ def load_and_train_csv(csv_file_path=None, course_id=None):
     
     return predictor, df, model_path
 
+def train_csv_streaming(csv_file_path, chunk_size=100000, resources=None):
+    """
+    Out-of-core variant of load_and_train_csv for CSVs larger than memory:
+    trains the streaming SGD model chunk by chunk and writes predictions
+    chunk by chunk, so memory is bounded by ``chunk_size``
+    """
+    print(f"Streaming CSV file in chunks of {chunk_size}: {csv_file_path}")
+    
+    predictor = StudentPerformancePredictor(resources=resources)
+    metrics, _ = predictor.train_streaming(csv_chunks(csv_file_path, chunk_size), 'sgd')
+    print(f"Trained sgd on {predictor.manifest['training_rows']} records, "
+          f"progressive accuracy: {metrics['accuracy']:.2%}")
+    
+    # Save the trained model
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    model_path = predictor.save_model(f"trained_model_{timestamp}.joblib")
+    print(f"\nModel saved to: {model_path}")
+    
+    output_csv = csv_file_path.replace('.csv', '_with_predictions.csv')
+    for i, df in enumerate(pd.read_csv(csv_file_path, chunksize=chunk_size)):
+        predictions = predictor.predict_batch(df)
+        df['predicted_performance'] = [p['prediction'].split()[0].lower() for p in predictions]
+        df['is_at_risk'] = [p['is_at_risk'] for p in predictions]
+        df.to_csv(output_csv, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    print(f"Predictions saved to: {output_csv}")
+    
+    return predictor, None, model_path
+
 def import_to_database(df, course_id=None):
     """
     Import CSV data with predictions to Django database
@@ -0,0 +1,124 @@
+# performance_app/tree_inference.py
+"""
+NumPy inference for fitted RandomForest / DecisionTree pipelines.
+
+sklearn's predict_proba validates input and dispatches per tree, which
+dominates latency for one or a few students. CompiledTreeModel flattens the
+preprocessing steps and every tree into contiguous arrays once, then
+evaluates a batch by walking all trees for all rows at the same time.
+"""
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+SUPPORTED_ESTIMATORS = (RandomForestClassifier, DecisionTreeClassifier)
+
+
+def supports_compilation(pipeline):
+    """
+    True if every step of the pipeline can be compiled
+    """
+    if pipeline is None:
+        return False
+    *preprocessing, (_, estimator) = pipeline.steps
+    return (isinstance(estimator, SUPPORTED_ESTIMATORS)
+            and all(isinstance(step, (SimpleImputer, StandardScaler)) for _, step in preprocessing))
+
+
+class CompiledTreeModel:
+    """
+    Flattened imputer + scaler + tree ensemble
+
+    All trees share one node table; leaf nodes point to themselves so the
+    traversal can run a fixed number of steps (the deepest tree's depth)
+    without per-row branching.
+    """
+
+    def __init__(self, pipeline):
+        if not supports_compilation(pipeline):
+            raise ValueError("Only imputer/scaler + RandomForest/DecisionTree pipelines can be compiled")
+
+        *preprocessing, (_, estimator) = pipeline.steps
+        self.classes_ = estimator.classes_
+        self.n_features = estimator.n_features_in_
+
+        self.fill_values = None
+        self.mean = None
+        self.scale = None
+        for _, step in preprocessing:
+            if isinstance(step, SimpleImputer):
+                self.fill_values = np.asarray(step.statistics_, dtype=np.float32)
+            elif isinstance(step, StandardScaler):
+                self.mean = step.mean_ if step.with_mean else None
+                self.scale = step.scale_ if step.with_std else None
+
+        trees = estimator.estimators_ if isinstance(estimator, RandomForestClassifier) else [estimator]
+        self._flatten([tree.tree_ for tree in trees])
+
+    def _flatten(self, trees):
+        sizes = [tree.node_count for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        total = int(sum(sizes))
+        n_classes = len(self.classes_)
+
+        feature = np.zeros(total, dtype=np.intp)
+        threshold = np.zeros(total, dtype=np.float64)
+        left = np.empty(total, dtype=np.intp)
+        right = np.empty(total, dtype=np.intp)
+        values = np.empty((total, n_classes), dtype=np.float64)
+
+        for tree, offset, size in zip(trees, offsets, sizes):
+            nodes = slice(offset, offset + size)
+            own_index = np.arange(offset, offset + size)
+            is_leaf = tree.children_left == -1
+
+            feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            threshold[nodes] = np.where(is_leaf, 0.0, tree.threshold)
+            left[nodes] = np.where(is_leaf, own_index, tree.children_left + offset)
+            right[nodes] = np.where(is_leaf, own_index, tree.children_right + offset)
+
+            # Per-node class distribution, normalised like DecisionTreeClassifier.predict_proba
+            node_values = tree.value[:, 0, :]
+            totals = node_values.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            values[nodes] = node_values / totals
+
+        self.feature = feature
+        self.threshold = threshold
+        # children[node] = (right, left), indexed by the boolean "go left" outcome
+        self.children = np.ascontiguousarray(np.stack([right, left], axis=1))
+        self.values = values
+        self.roots = np.asarray(offsets, dtype=np.intp)
+        self.depth = max(tree.max_depth for tree in trees)
+
+    def transform(self, X):
+        """
+        Imputation and scaling, reproducing the pipeline's float32 arithmetic
+        """
+        X = np.array(X, dtype=np.float32, copy=True).reshape(-1, self.n_features)
+        if self.fill_values is not None:
+            missing = np.isnan(X)
+            if missing.any():
+                X[missing] = np.broadcast_to(self.fill_values, X.shape)[missing]
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+    def predict_proba(self, X):
+        X = self.transform(X).astype(np.float64)
+        n_rows = len(X)
+        # Row offsets into the flattened X so one take() fetches every tree's split feature
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * self.n_features)[:, None]
+        flat_X = X.ravel()
+        nodes = np.tile(self.roots, (n_rows, 1))
+        for _ in range(self.depth):
+            go_left = flat_X.take(row_offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+            nodes = self.children[nodes, go_left.view(np.int8)]
+        return self.values[nodes].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -26,10 +26,21 @@ urlpatterns = [
     # Prediction
     path('predict/', views.predict_performance, name='predict_performance'),
     path('predictions/', views.predictions_view, name='predictions_view'),
+    path('predictions/export/', views.export_predictions, name='export_predictions'),
+    path('predictions/report/<int:course_id>/', views.predictions_report, name='predictions_report'),
+
+    # Model management
+    path('models/', views.models_list, name='models_list'),
+    path('models/train/', views.train_model_view, name='train_model'),
     
     # Visualization
     path('visualize/', views.visualize_data, name='visualize_data'),
     path('api/performance-distribution/', views.api_performance_distribution, name='api_performance_distribution'),
+    path('api/predict/', views.api_predict, name='api_predict'),
+
+    # Health checks
+    path('healthz/ready', views.healthz_ready, name='healthz_ready'),
+    path('metrics', views.metrics, name='metrics'),
 
     # Admin URLs
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
@@ -2,26 +2,44 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
 from django.db.models import Q
 from django.conf import settings
-import pandas as pd
+import asyncio
 import json
-import os
+import time
 from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
 
 from .forms import (
     UserRegistrationForm, UserLoginForm, CourseForm, 
     CSVUploadForm, StudentForm
 )
 from .models import UserProfile, Course, Student, UploadedFile, PredictionModel, Instructor
-from .ml_model import StudentPerformancePredictor
-from .utils import generate_charts
+from .features import FEATURE_COLUMNS
+from .lazy import lazy_import
+from .inference import ascore_features
+from .model_refresh import refresh_active_model, register_model
+from .exports import predictions_csv, predictions_xlsx, xlsx_available
+from .instrumentation import metrics_payload
+from .profiling import span
+from .warmup import warmup_status
+from .feature_store import deferred_invalidation, get_course_features, get_features_for_courses, invalidate_course
+from .utils import generate_charts, generate_predictions_pdf
+
+# pandas and scikit-learn are imported on first use, not at worker boot
+pd = lazy_import('pandas')
+ml_model = lazy_import('.ml_model', __package__)
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import transaction
 from .models import UserProfile, Student, Course
 from .forms import AdminStudentRegistrationForm, AdminInstructorRegistrationForm
 import random
@@ -62,57 +80,74 @@ def get_or_create_user_profile(user):
 def get_student_for_user(user):
     return Student.objects.filter(user_account=user).first()
 
+def async_login_required(view):
+    """login_required for async views"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from .models import UserProfile, Student, Course
 
 
-@login_required
-def dashboard(request):
-    user_profile = UserProfile.objects.get(user=request.user)
+@async_login_required
+async def dashboard(request):
+    user = await request.auser()
+    user_profile = await UserProfile.objects.aget(user=user)
 
     # ✅ SAFE student lookup
     student_obj = None
     if user_profile.role == 'student':
-        student_obj = Student.objects.filter(user_account=request.user).first()
+        student_obj = await Student.objects.select_related('course').filter(user_account=user).afirst()
 
     # Instructor dashboard
     if user_profile.role == 'instructor':
-        courses = Course.objects.filter(instructor=request.user)
-        total_students = Student.objects.filter(course__in=courses).count()
-        at_risk_students = Student.objects.filter(
-            course__in=courses, is_at_risk=True
-        ).count()
-        recent_students = Student.objects.filter(
-            course__in=courses
-        ).order_by('-created_at')[:5]
+        courses = Course.objects.filter(instructor=user)
+        students = Student.objects.filter(course__in=courses)
+        total_courses, total_students, at_risk_students, recent_students = await asyncio.gather(
+            courses.acount(),
+            students.acount(),
+            students.filter(is_at_risk=True).acount(),
+            _alist(students.order_by('-created_at')[:5]),
+        )
 
     # Admin dashboard
     elif user_profile.role == 'admin':
-        courses = Course.objects.all()
-        total_students = Student.objects.count()
-        at_risk_students = Student.objects.filter(is_at_risk=True).count()
-        recent_students = Student.objects.order_by('-created_at')[:5]
+        total_courses, total_students, at_risk_students, recent_students = await asyncio.gather(
+            Course.objects.acount(),
+            Student.objects.acount(),
+            Student.objects.filter(is_at_risk=True).acount(),
+            _alist(Student.objects.order_by('-created_at')[:5]),
+        )
 
     # Student dashboard
     else:
-        courses = Course.objects.filter(student__user_account=request.user)
         total_students = 1
-        at_risk_students = Student.objects.filter(
-            user_account=request.user, is_at_risk=True
-        ).count()
+        total_courses, at_risk_students = await asyncio.gather(
+            Course.objects.filter(student__user_account=user).acount(),
+            Student.objects.filter(user_account=user, is_at_risk=True).acount(),
+        )
         recent_students = []
 
     context = {
         'user_profile': user_profile,
         'student_obj': student_obj,   # ✅ IMPORTANT
-        'total_courses': courses.count(),
+        'total_courses': total_courses,
         'total_students': total_students,
         'at_risk_students': at_risk_students,
         'recent_students': recent_students,
     }
 
-    return render(request, 'performance_app/instructor/dashboard.html', context)
+    # Template rendering (context processors included) runs sync ORM code
+    return await sync_to_async(render)(request, 'performance_app/instructor/dashboard.html', context)
 
 
 @login_required
@@ -451,7 +486,8 @@ def admin_instructors_list(request):
     user_profile = UserProfile.objects.get(user=request.user)
     
     # Use Instructor model instead of UserProfile
-    instructors = Instructor.objects.select_related('user_account').all().order_by('-created_at')
+    instructors = (Instructor.objects.select_related('user_account')
+                   .prefetch_related('user_account__courses').order_by('-created_at'))
     
     # Calculate statistics
     total_instructors = instructors.count()
@@ -483,6 +519,75 @@ def reset_password(request, user_id):
     return redirect(request.META.get('HTTP_REFERER', 'admin_dashboard'))
 
 
+def _import_student_batch(rows, course):
+    """
+    Create the accounts and students of one CSV batch in a single transaction
+    """
+    usernames = {f"stu_{str(row['student_id']).strip()}" for row in rows}
+    # Hash passwords for new accounts before the transaction takes the write lock
+    with span('account'):
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        password_hashes = {username: make_password(DEFAULT_PASSWORD) for username in usernames - existing}
+
+    # One feature-store invalidation per batch instead of one per saved student
+    with deferred_invalidation(), transaction.atomic():
+        for row in rows:
+            student_id = str(row['student_id']).strip()
+            first_name = row['first_name']
+            last_name = row['last_name']
+            email = row['email']
+
+            # ===============================
+            # 1️⃣ CREATE USER ACCOUNT
+            # ===============================
+            with span('account'):
+                username = f"stu_{student_id}"
+                defaults = {
+                    'first_name': first_name,
+                    'last_name': last_name,
+                    'email': email,
+                }
+                if username in password_hashes:
+                    defaults['password'] = password_hashes[username]
+
+                user, created = User.objects.get_or_create(username=username, defaults=defaults)
+
+                if created:
+                    if username not in password_hashes:
+                        # Created since the batch was prepared
+                        user.set_password(DEFAULT_PASSWORD)
+                        user.save(update_fields=['password'])
+
+                    # Create UserProfile
+                    UserProfile.objects.create(
+                        user=user,
+                        role='student',
+                        institution='',
+                        phone=''
+                    )
+
+            # ===============================
+            # 2️⃣ CREATE / UPDATE STUDENT
+            # ===============================
+            with span('student'):
+                Student.objects.update_or_create(
+                    student_id=student_id,
+                    course=course,
+                    defaults={
+                        'first_name': first_name,
+                        'last_name': last_name,
+                        'email': email,
+                        'attendance': row.get('attendance', 100.0),
+                        'assignment_score': row.get('assignment_score', 0.0),
+                        'quiz_score': row.get('quiz_score', 0.0),
+                        'time_spent': row.get('time_spent', 0.0),
+                        'forum_posts': row.get('forum_posts', 0),
+                        'resources_viewed': row.get('resources_viewed', 0),
+                        'user_account': user,   # 🔥 THIS FIXES LOGIN
+                    }
+                )
+
+
 @login_required
 def upload_csv(request):
     user_profile = UserProfile.objects.get(user=request.user)
@@ -496,7 +601,8 @@ def upload_csv(request):
             uploaded_file.save()
 
             try:
-                df = pd.read_csv(uploaded_file.file.path)
+                with span('parse'):
+                    df = pd.read_csv(uploaded_file.file.path)
 
                 # REQUIRED columns
                 required_columns = ['student_id', 'first_name', 'last_name', 'email']
@@ -507,57 +613,12 @@ def upload_csv(request):
 
                 course = uploaded_file.course
 
-                for _, row in df.iterrows():
-                    student_id = str(row['student_id']).strip()
-                    first_name = row['first_name']
-                    last_name = row['last_name']
-                    email = row['email']
-
-                    # ===============================
-                    # 1️⃣ CREATE USER ACCOUNT
-                    # ===============================
-                    username = f"stu_{student_id}"
-
-                    user, created = User.objects.get_or_create(
-                        username=username,
-                        defaults={
-                            'first_name': first_name,
-                            'last_name': last_name,
-                            'email': email,
-                        }
-                    )
-
-                    if created:
-                        user.set_password(DEFAULT_PASSWORD)
-                        user.save()
-
-                        # Create UserProfile
-                        UserProfile.objects.create(
-                            user=user,
-                            role='student',
-                            institution='',
-                            phone=''
-                        )
-
-                    # ===============================
-                    # 2️⃣ CREATE / UPDATE STUDENT
-                    # ===============================
-                    Student.objects.update_or_create(
-                        student_id=student_id,
-                        course=course,
-                        defaults={
-                            'first_name': first_name,
-                            'last_name': last_name,
-                            'email': email,
-                            'attendance': row.get('attendance', 100.0),
-                            'assignment_score': row.get('assignment_score', 0.0),
-                            'quiz_score': row.get('quiz_score', 0.0),
-                            'time_spent': row.get('time_spent', 0.0),
-                            'forum_posts': row.get('forum_posts', 0),
-                            'resources_viewed': row.get('resources_viewed', 0),
-                            'user_account': user,   # 🔥 THIS FIXES LOGIN
-                        }
-                    )
+                # Short transactions of CSV_IMPORT_BATCH_ROWS rows: readers and
+                # other uploads only wait for one batch, not the whole file
+                records = df.to_dict('records')
+                batch_rows = max(1, getattr(settings, 'CSV_IMPORT_BATCH_ROWS', 100))
+                for start in range(0, len(records), batch_rows):
+                    _import_student_batch(records[start:start + batch_rows], course)
 
                 uploaded_file.processed = True
                 uploaded_file.rows_processed = len(df)
@@ -594,6 +655,8 @@ def students_list(request):
         students = Student.objects.filter(course__in=courses)
     else:
         students = Student.objects.all()
+    # The template shows each student's course
+    students = students.select_related('course')
     
     # Filter by course if course_id is provided in query parameters
     course_id = request.GET.get('course')
@@ -659,50 +722,42 @@ def predict_performance(request):
                 messages.error(request, 'You do not have access to this course.')
                 return redirect('predict_performance')
             
-            # Get students for this course
-            students = Student.objects.filter(course=course)
+            # Cached feature matrix for this course (no ORM objects); the version is
+            # checked against the database so students imported by another worker are included
+            features = get_course_features(course.id, fresh=True)
             
-            if not students.exists():
+            if len(features.ids) == 0:
                 messages.error(request, 'No students found in this course.')
                 return redirect('predict_performance')
             
-            # Convert to DataFrame
-            data = []
-            for student in students:
-                data.append({
-                    'student_id': student.student_id,
-                    'attendance': student.attendance,
-                    'assignment_score': student.assignment_score,
-                    'quiz_score': student.quiz_score,
-                    'time_spent': student.time_spent,
-                    'forum_posts': student.forum_posts,
-                    'resources_viewed': student.resources_viewed,
-                })
-            
-            df = pd.DataFrame(data)
-            
             # Train and predict (using default Random Forest)
-            predictor = StudentPerformancePredictor()
-            metrics, features = predictor.train_model(df, 'random_forest')
+            predictor = ml_model.StudentPerformancePredictor()
+            metrics, _ = predictor.train_model(features.X, 'random_forest')
             
             # Make predictions
-            predictions = predictor.predict_batch(df)
+            predictions = predictor.predict_batch(features.X, student_ids=list(features.student_ids))
             
-            # Update students with predictions
-            updated_count = 0
-            for pred in predictions:
+            # Update students with predictions in one bulk query
+            now = timezone.now()
+            updates = []
+            for pk, pred in zip(features.ids, predictions):
                 if pred['prediction'] != 'Error':
-                    try:
-                        student = Student.objects.get(
-                            student_id=pred['student_id'],
-                            course=course
-                        )
-                        student.predicted_performance = pred['prediction'].split(' ')[0].lower()
-                        student.is_at_risk = pred['is_at_risk']
-                        student.save()
-                        updated_count += 1
-                    except Student.DoesNotExist:
-                        continue
+                    updates.append(Student(
+                        id=int(pk),
+                        predicted_performance=pred['prediction'].split(' ')[0].lower(),
+                        is_at_risk=pred['is_at_risk'],
+                        prediction_confidence=pred['confidence'],
+                        prediction_model=predictor.model_version,
+                        updated_at=now,
+                    ))
+            Student.objects.bulk_update(
+                updates,
+                ['predicted_performance', 'is_at_risk', 'prediction_confidence', 'prediction_model', 'updated_at'],
+                batch_size=500,
+            )
+            updated_count = len(updates)
+            # bulk_update bypasses save() signals
+            invalidate_course(course.id)
             
             messages.success(
                 request, 
@@ -720,6 +775,7 @@ def predict_performance(request):
         courses = Course.objects.filter(instructor=request.user)
     else:
         courses = Course.objects.all()
+    courses = courses.select_related('instructor')
     
     context = {
         'user_profile': user_profile,
@@ -737,12 +793,13 @@ def predictions_view(request):
         students = Student.objects.filter(course__in=courses)
     else:
         students = Student.objects.all()
+    students = students.select_related('course')
     
-    # Performance distribution
+    # Performance distribution, counted by the database
     performance_dist = {}
-    for student in students:
-        perf = student.predicted_performance or 'Not Predicted'
-        performance_dist[perf] = performance_dist.get(perf, 0) + 1
+    for row in students.order_by().values('predicted_performance').annotate(count=Count('id')):
+        perf = row['predicted_performance'] or 'Not Predicted'
+        performance_dist[perf] = performance_dist.get(perf, 0) + row['count']
     
     context = {
         'students': students,
@@ -753,6 +810,53 @@ def predictions_view(request):
     }
     return render(request, 'performance_app/instructor/predictions.html', context)
 
+@login_required
+def export_predictions(request):
+    """Stream the user's predictions as CSV (?format=xlsx for Excel, ?course=<id> to filter)"""
+    user_profile = UserProfile.objects.get(user=request.user)
+    
+    if user_profile.role == 'instructor':
+        students = Student.objects.filter(course__instructor=request.user)
+    elif user_profile.role == 'student':
+        students = Student.objects.filter(user_account=request.user)
+    else:
+        students = Student.objects.all()
+    
+    course_id = request.GET.get('course', '').strip()
+    if course_id.isdigit():
+        students = students.filter(course_id=int(course_id))
+    
+    filename = f"predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    if request.GET.get('format') == 'xlsx':
+        if not xlsx_available():
+            return HttpResponse('Excel export requires openpyxl', status=501, content_type='text/plain')
+        return FileResponse(
+            predictions_xlsx(students), as_attachment=True, filename=f'{filename}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    
+    response = StreamingHttpResponse(predictions_csv(students), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+@login_required
+def predictions_report(request, course_id):
+    """Stream a course's predictions PDF (rendered once per prediction run)"""
+    user_profile = UserProfile.objects.get(user=request.user)
+    course = get_object_or_404(Course, id=course_id)
+    
+    if user_profile.role == 'student' or (
+            user_profile.role == 'instructor' and course.instructor_id != request.user.id):
+        messages.error(request, 'You do not have permission to view this report.')
+        return redirect('predictions_view')
+    
+    path = generate_predictions_pdf(course)
+    # FileResponse streams the cached file in blocks (wsgi.file_wrapper when available)
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True, content_type='application/pdf',
+        filename=f'predictions_{course.course_id}.pdf',
+    )
+
 # In views.py, ensure you have the right import
 from .utils import generate_charts
 
@@ -762,18 +866,18 @@ def visualize_data(request):
     user_profile = UserProfile.objects.get(user=request.user)
     
     if user_profile.role == 'instructor':
-        courses = Course.objects.filter(instructor=request.user)
-        students = Student.objects.filter(course__in=courses)
+        course_ids = list(Course.objects.filter(instructor=request.user).values_list('id', flat=True))
     else:
-        students = Student.objects.all()
+        course_ids = list(Course.objects.values_list('id', flat=True)) + [None]
     
-    # Generate charts
-    charts = generate_charts(students)
+    # Generate charts from the cached per-course feature matrices
+    features = get_features_for_courses(course_ids)
+    charts = generate_charts(features)
     
     context = {
         'user_profile': user_profile,
         'charts': charts,
-        'total_students': students.count(),
+        'total_students': len(features.ids),
     }
     return render(request, 'performance_app/student/visualize.html', context)
 
@@ -810,28 +914,97 @@ def student_detail(request, student_id):
     }
     return render(request, 'performance_app/student/student_detail.html', context)
 
-@login_required
-def api_performance_distribution(request):
+@async_login_required
+async def api_performance_distribution(request):
     """API for performance distribution chart"""
-    user_profile = UserProfile.objects.get(user=request.user)
+    user = await request.auser()
+    user_profile = await UserProfile.objects.aget(user=user)
     
     if user_profile.role == 'instructor':
-        courses = Course.objects.filter(instructor=request.user)
-        students = Student.objects.filter(course__in=courses)
+        students = Student.objects.filter(course__instructor=user)
     else:
         students = Student.objects.all()
     
+    # One grouped query instead of a count per category
+    counts = {
+        row['predicted_performance']: row['count']
+        async for row in students.order_by().values('predicted_performance').annotate(count=Count('id'))
+    }
+    
     distribution = {
-        'Excellent': students.filter(predicted_performance='excellent').count(),
-        'Good': students.filter(predicted_performance='good').count(),
-        'Average': students.filter(predicted_performance='average').count(),
-        'Poor': students.filter(predicted_performance='poor').count(),
-        'At Risk': students.filter(predicted_performance='at_risk').count(),
-        'Not Predicted': students.filter(predicted_performance='').count(),
+        'Excellent': counts.get('excellent', 0),
+        'Good': counts.get('good', 0),
+        'Average': counts.get('average', 0),
+        'Poor': counts.get('poor', 0),
+        'At Risk': counts.get('at_risk', 0),
+        'Not Predicted': counts.get('', 0),
     }
     
     return JsonResponse(distribution)
 
+@async_login_required
+async def api_predict(request):
+    """
+    Score one student on demand against the active model.
+
+    GET ?student_id=S1001, or POST JSON {"student_id": "S1001"} or
+    {"features": {"attendance": 90, ...}} (instructors/admins only).
+    """
+    started = time.perf_counter()
+    user = await request.auser()
+    user_profile = await UserProfile.objects.aget(user=user)
+
+    if request.method == 'POST':
+        try:
+            payload = json.loads(request.body or b'{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+    elif request.method == 'GET':
+        payload = request.GET.dict()
+    else:
+        return JsonResponse({'error': 'Method not allowed.'}, status=405)
+
+    student_id = payload.get('student_id')
+    if student_id:
+        students = Student.objects.filter(student_id=student_id)
+        if user_profile.role == 'instructor':
+            students = students.filter(course__instructor=user)
+        elif user_profile.role == 'student':
+            students = students.filter(user_account=user)
+        features = await students.values(*FEATURE_COLUMNS).afirst()
+        if features is None:
+            return JsonResponse({'error': 'Student not found.'}, status=404)
+    elif isinstance(payload.get('features'), dict):
+        if user_profile.role == 'student':
+            return JsonResponse({'error': 'Access denied.'}, status=403)
+        features = payload['features']
+    else:
+        return JsonResponse({'error': 'Provide student_id or features.'}, status=400)
+
+    try:
+        result = await ascore_features(features)
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'error': f'Invalid features: {e}'}, status=400)
+
+    result['student_id'] = student_id
+    result['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return JsonResponse(result)
+
+def healthz_ready(request):
+    """
+    Readiness probe: 503 until the startup warm-up has finished (always 200
+    when ML_WARMUP_ON_STARTUP is off)
+    """
+    state = warmup_status()
+    return JsonResponse(state, status=200 if state['ready'] else 503)
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint (see performance_app.instrumentation)
+    """
+    body, content_type = metrics_payload()
+    return HttpResponse(body, content_type=content_type)
+
 @login_required
 def add_course(request):
     """Add a new course"""
@@ -869,7 +1042,7 @@ def courses_list(request):
     # Annotate with student count
     courses = courses.annotate(
         student_count=Count('student')
-    ).select_related('instructor')
+    ).select_related('instructor__userprofile')
 
     # Calculate statistics for admin
     statistics = {}
@@ -901,10 +1074,11 @@ def courses_list(request):
     at_risk_count = 0
     
     if user_profile.role == 'instructor':
-        for course in courses:
-            students = Student.objects.filter(course=course)
-            total_students_count += students.count()
-            at_risk_count += students.filter(is_at_risk=True).count()
+        totals = Student.objects.filter(course__instructor=request.user).aggregate(
+            total=Count('id'), at_risk=Count('id', filter=Q(is_at_risk=True))
+        )
+        total_students_count = totals['total']
+        at_risk_count = totals['at_risk']
 
     context = {
         'courses': courses,
@@ -1010,10 +1184,39 @@ def admin_delete_student(request, student_id):
     return redirect('admin_students_list')
 
 @login_required
+@user_passes_test(is_admin)
+def models_list(request):
+    """Trained models, newest first, with their refresh lineage"""
+    user_profile = UserProfile.objects.get(user=request.user)
+    prediction_models = (PredictionModel.objects.select_related('trained_by', 'parent')
+                         .order_by('-created_at'))
+    return render(request, 'performance_app/admin/models_list.html', {
+        'user_profile': user_profile,
+        'prediction_models': prediction_models,
+    })
+
+@login_required
+@user_passes_test(is_admin)
 def train_model_view(request):
     """Train model with uploaded CSV"""
     user_profile = UserProfile.objects.get(user=request.user)
     
+    if request.method == 'POST' and request.POST.get('mode') == 'refresh':
+        # Warm-start the active model with students added since it was trained
+        try:
+            record, metrics = refresh_active_model(user=request.user)
+            if record is None:
+                messages.info(request, 'No new student data since the active model was trained.')
+            else:
+                messages.success(
+                    request,
+                    f'Model refreshed with {record.evaluation["new_rows"]} new rows '
+                    f'(accuracy on them before refresh: {metrics["accuracy"]:.2%})'
+                )
+        except Exception as e:
+            messages.error(request, f'Error refreshing model: {str(e)}')
+        return redirect('models_list')
+    
     if request.method == 'POST':
         # Handle CSV upload and training
         form = CSVUploadForm(request.POST, request.FILES)
@@ -1024,37 +1227,40 @@ def train_model_view(request):
             uploaded_file.save()
             
             try:
-                # Process CSV
-                df = pd.read_csv(uploaded_file.file.path)
-                
                 # Get algorithm
                 algorithm = request.POST.get('algorithm', 'random_forest')
                 
-                # Train model
-                predictor = StudentPerformancePredictor()
-                metrics, features = predictor.train_model(df, algorithm)
+                # Optional per-run override of settings.ML_TRAINING_RESOURCES
+                n_jobs = request.POST.get('n_jobs', '').strip()
+                resources = {'n_jobs': int(n_jobs), 'cv_n_jobs': int(n_jobs)} if n_jobs else None
                 
-                # Save model
-                filename = f"trained_model_{datetime.now().strftime('%Y%m%d_%H%M%S')}.joblib"
-                model_path = predictor.save_model(filename)
+                # Optional hyperparameter search before the final fit
+                tune = request.POST.get('tune') == 'on'
                 
-                # Create model record
-                model_record = PredictionModel.objects.create(
-                    name=f"Trained Model {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-                    algorithm=algorithm,
-                    accuracy=metrics['accuracy'],
-                    precision=metrics['precision'],
-                    recall=metrics['recall'],
-                    model_file=str(model_path).replace(str(settings.MEDIA_ROOT) + '/', ''),
-                    features=json.dumps(features),
-                    is_active=True,
-                    trained_by=request.user
-                )
+                # Train model
+                predictor = ml_model.StudentPerformancePredictor(resources=resources)
+                if algorithm in ml_model.STREAMING_ALGORITHMS:
+                    # Stream the CSV in chunks instead of loading it into memory
+                    metrics, features = predictor.train_streaming(
+                        ml_model.csv_chunks(uploaded_file.file.path), algorithm
+                    )
+                else:
+                    df = pd.read_csv(uploaded_file.file.path)
+                    metrics, features = predictor.train_model(df, algorithm, tune=tune)
+                
+                # Save the model and make it the active one
+                register_model(predictor, metrics, features, 'Trained Model', user=request.user)
                 
                 messages.success(
                     request, 
                     f'Model trained successfully! Accuracy: {metrics["accuracy"]:.2%}'
                 )
+                if predictor.tuning.get('best_params'):
+                    messages.info(
+                        request,
+                        f'Tuned {predictor.tuning["candidates_evaluated"]} candidates in '
+                        f'{predictor.tuning["search_seconds"]:.0f}s: {predictor.tuning["best_params"]}'
+                    )
                 return redirect('models_list')
                 
             except Exception as e:
@@ -1070,8 +1276,12 @@ def train_model_view(request):
             ('random_forest', 'Random Forest'),
             ('decision_tree', 'Decision Tree'),
             ('logistic_regression', 'Logistic Regression'),
-            ('svm', 'Support Vector Machine'),
-            ('gradient_boosting', 'Gradient Boosting')
+            ('svm', 'Support Vector Machine (approximate above ML_SVM_EXACT_MAX_ROWS rows)'),
+            ('svm_approx', 'Support Vector Machine (Nystroem approximation)'),
+            ('gradient_boosting', 'Gradient Boosting'),
+            ('hist_gradient_boosting', 'Histogram Gradient Boosting (recommended for large datasets)'),
+            ('sgd', 'SGD (streaming, for files larger than memory)'),
+            ('auto', 'Auto (pick by dataset size)'),
         ]
     }
-    return render(request, 'performance_app/train_model.html', context)
\ No newline at end of file
+    return render(request, 'performance_app/admin/train_model.html', context)
\ No newline at end of file
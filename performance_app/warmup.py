@@ -0,0 +1,190 @@
+# performance_app/warmup.py
+"""
+Worker warm-up before the first request.
+
+With ML_WARMUP_ON_STARTUP enabled, PerformanceAppConfig.ready() starts
+warm_up() on a background thread: it loads the active PredictionModel into
+the inference cache, scores a dummy batch so lazy imports, compiled trees and
+the micro-batcher thread are initialised, and primes the matplotlib and
+reportlab font caches. /healthz/ready answers 503 until it has finished (and
+keeps answering 503 if a step failed, e.g. a missing model file), so a load
+balancer only routes traffic to warm, working workers.
+
+A server that loads the app before forking (gunicorn --preload) runs ready()
+in the master only. Threads do not survive fork(), so every forked worker
+resets the inherited warm-up state and starts its own warm-up.
+"""
+import io
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .features import FEATURE_COLUMNS, FEATURE_DEFAULTS
+
+# Commands that serve traffic; every other manage.py command skips warm-up
+SERVING_COMMANDS = ('runserver',)
+WARMUP_BATCH_ROWS = 64
+
+_lock = threading.Lock()
+_state = {
+    'status': 'pending',    # pending -> running -> ready | failed
+    'started_at': None,
+    'finished_at': None,
+    'steps': {},
+    'error': None,
+}
+
+
+def warmup_enabled():
+    return getattr(settings, 'ML_WARMUP_ON_STARTUP', False)
+
+
+def _is_management_command():
+    """
+    True for manage.py commands other than the ones that serve requests
+    """
+    argv = sys.argv
+    return (len(argv) > 1 and argv[0].endswith('manage.py')
+            and argv[1] not in SERVING_COMMANDS)
+
+
+def warmup_status():
+    """
+    Copy of the warm-up state plus a ``ready`` flag. Without warm-up enabled the
+    worker is ready as soon as it is up.
+    """
+    with _lock:
+        state = dict(_state, steps=dict(_state['steps']))
+    state['enabled'] = warmup_enabled()
+    state['ready'] = state['status'] == 'ready' or not state['enabled']
+    return state
+
+
+def _step(name, func):
+    """
+    Run one warm-up step, recording its duration and result; returns False on error
+    """
+    start = time.perf_counter()
+    try:
+        detail, ok = func(), True
+    except Exception as e:
+        print(f"Warm-up step '{name}' failed: {e}")
+        detail, ok = f'error: {e}', False
+    with _lock:
+        _state['steps'][name] = {'seconds': round(time.perf_counter() - start, 3), 'detail': detail}
+    return ok
+
+
+def _warm_model():
+    """
+    Load the active model and push a single row and a batch through it
+    """
+    from .inference import get_active_predictor, score_features
+
+    record, predictor, _ = get_active_predictor()
+    # Single-row path: micro-batcher, compiled trees and contributions
+    score_features(dict(zip(FEATURE_COLUMNS, FEATURE_DEFAULTS)))
+    if predictor is None or predictor.pipeline is None:
+        return 'rule-based fallback (no active model)'
+    rng = np.random.default_rng(0)
+    batch = (np.asarray(FEATURE_DEFAULTS, dtype=np.float32)
+             * rng.uniform(0.5, 1.5, size=(WARMUP_BATCH_ROWS, len(FEATURE_COLUMNS))).astype(np.float32))
+    predictor.predict_proba(batch)
+    return f'{record.name} ({record.algorithm})'
+
+
+def _warm_charts():
+    """
+    Import pyplot and render one figure with text so the font cache is built
+    """
+    from .lazy import pyplot
+
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(2, 2))
+    ax.bar(['a', 'b'], [1, 2])
+    ax.set_title('warm-up')
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+    return 'matplotlib'
+
+
+def _warm_reports():
+    """
+    Load the reportlab font metrics used by the predictions PDF
+    """
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    for font in ('Helvetica', 'Helvetica-Bold'):
+        stringWidth('warm-up', font, 8)
+    return 'reportlab'
+
+
+WARMUP_STEPS = (
+    ('model', _warm_model),
+    ('charts', _warm_charts),
+    ('reports', _warm_reports),
+)
+
+
+def warm_up():
+    """
+    Run every warm-up step; returns the final warmup_status()
+    """
+    with _lock:
+        already_started = _state['status'] in ('running', 'ready')
+        if not already_started:
+            _state.update(status='running', started_at=time.time(), finished_at=None, steps={}, error=None)
+    if already_started:
+        return warmup_status()
+
+    # Every step runs even if an earlier one fails, so the status shows all problems
+    failed = [name for name, func in WARMUP_STEPS if not _step(name, func)]
+    with _lock:
+        _state.update(
+            status='failed' if failed else 'ready',
+            error=f"failed steps: {', '.join(failed)}" if failed else None,
+            finished_at=time.time(),
+        )
+    return warmup_status()
+
+
+def _warm_up_thread():
+    from django.db import connections
+
+    try:
+        warm_up()
+    finally:
+        # Connections opened on this thread are never reused by request threads
+        connections.close_all()
+
+
+def start_warmup():
+    """
+    Start warm_up() on a daemon thread when enabled; called from AppConfig.ready()
+    """
+    if not warmup_enabled() or _is_management_command():
+        return None
+    thread = threading.Thread(target=_warm_up_thread, name='performance-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def _restart_after_fork():
+    """
+    In a forked worker: forget the parent's warm-up (its thread is gone, so a
+    'running' status would never finish) and warm this process up instead
+    """
+    global _lock
+    _lock = threading.Lock()
+    started = _state['status'] != 'pending'
+    _state.update(status='pending', started_at=None, finished_at=None, steps={}, error=None)
+    if started:
+        start_warmup()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)